@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic_settings import BaseSettings
 
 
@@ -19,10 +21,36 @@ class Settings(BaseSettings):
     # Qdrant
     qdrant_url: str
     qdrant_api_key: str
+    # gRPC (port 6334) is used for points traffic; set false where only the
+    # REST port is reachable
+    qdrant_prefer_grpc: bool = True
+    
+    # Qdrant index tuning (applies to newly created collections)
+    hnsw_m: int = 16
+    hnsw_ef_construct: int = 128
+    hnsw_ef_search: int = 128
+    vectors_on_disk: bool = False
+    indexing_threshold: int = 20000
+    
+    # Reciprocal Rank Fusion constant for hybrid search. Unset uses Qdrant's
+    # built-in RRF; setting it fuses dense and sparse results in the app
+    rrf_k: Optional[int] = None
     
     # Cohere (for reranking)
     cohere_api_key: str
     
+    # Load the embedding services at startup instead of on the first ingest
+    # or search (costs memory in workers that only serve auth)
+    warm_up_on_startup: bool = False
+    
+    # Redis (optional, for sessions shared across workers)
+    redis_url: Optional[str] = None
+    
+    # Semantic cache: reuse search results for near-identical questions
+    enable_semantic_cache: bool = False
+    semantic_cache_threshold: float = 0.95
+    semantic_cache_ttl_seconds: int = 24 * 60 * 60
+    
     class Config:
         env_file = ".env"
 
@@ -1,13 +1,50 @@
-from typing import Dict
+import hashlib
+import time
+from typing import Dict, Optional
 
+from cachetools import TTLCache
 from fastapi import Request, HTTPException
 from jose import jwt, JWTError
 
 from app.config import settings
+from app.services.session_store import get_session
 
 ALGORITHM = "HS256"
 COOKIE_NAME = "session"
 
+# Decoded session payloads, keyed by a hash of the token so raw tokens
+# are never held in memory
+_session_cache = TTLCache(maxsize=10000, ttl=30)
+
+
+def decode_session(token: str) -> Dict:
+    """Decode a session token, reusing a recently decoded payload if possible.
+    
+    Raises:
+        JWTError: If the token is invalid or expired
+    """
+    key = hashlib.sha256(token.encode()).hexdigest()[:32]
+    cached = _session_cache.get(key)
+    if cached is not None and cached["exp"] > time.time():
+        return cached
+    
+    payload = jwt.decode(token, settings.secret_key, algorithms=[ALGORITHM])
+    _session_cache[key] = payload
+    return payload
+
+
+def resolve_session(payload: Dict) -> Optional[Dict]:
+    """Return the session a decoded token refers to, or None if it's gone.
+    
+    Tokens either carry a server-side session id (with Redis) or the
+    session itself.
+    """
+    if "sid" in payload:
+        return get_session(payload["sid"])
+    if "user" in payload:
+        return payload
+    return None
+
 
 def get_current_session(request: Request) -> Dict:
     """Extract and validate the session from cookies.
@@ -19,10 +56,15 @@ def get_current_session(request: Request) -> Dict:
         raise HTTPException(status_code=401, detail="Not authenticated")
     
     try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[ALGORITHM])
-        return payload
+        payload = decode_session(token)
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid or expired session")
+    
+    session = resolve_session(payload)
+    if session is None:
+        raise HTTPException(status_code=401, detail="Invalid or expired session")
+    
+    return session
 
 
 def get_google_tokens(request: Request) -> Dict:
@@ -34,4 +76,3 @@ def get_google_tokens(request: Request) -> Dict:
         raise HTTPException(status_code=401, detail="No Google access token found")
     
     return google_tokens
-
@@ -1,23 +1,160 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from app.config import settings
 from app.routers import auth, drive, chat
 
+
+class PureCORS:
+    """Minimal CORS handling for a single allowed origin, as plain ASGI.
+    
+    Preflight requests are answered directly without going through the router.
+    """
+    
+    def __init__(self, app: ASGIApp, allow_origin: bytes):
+        self.app = app
+        self.allow_origin = allow_origin
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        headers = dict(scope["headers"])
+        if headers.get(b"origin") != self.allow_origin:
+            await self.app(scope, receive, send)
+            return
+        
+        cors_headers = [
+            (b"access-control-allow-origin", self.allow_origin),
+            (b"access-control-allow-credentials", b"true"),
+            (b"vary", b"Origin"),
+        ]
+        
+        request_method = headers.get(b"access-control-request-method")
+        if scope["method"] == "OPTIONS" and request_method:
+            # Browsers don't accept "*" for credentialed requests, so echo
+            # back exactly what the preflight asked for
+            preflight_headers = cors_headers + [
+                (b"access-control-allow-methods", request_method),
+                (b"access-control-max-age", b"600"),
+            ]
+            request_headers = headers.get(b"access-control-request-headers")
+            if request_headers:
+                preflight_headers.append((b"access-control-allow-headers", request_headers))
+            
+            await send({
+                "type": "http.response.start",
+                "status": 204,
+                "headers": preflight_headers,
+            })
+            await send({"type": "http.response.body", "body": b""})
+            return
+        
+        async def send_with_cors(message: Message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + cors_headers
+            await send(message)
+        
+        await self.app(scope, receive, send_with_cors)
+
+
+class GZipExceptEventStream:
+    """GZip responses, except for Server-Sent Event streams.
+    
+    The gzip compressor buffers output, which would hold back SSE events
+    until the stream ends. The choice is made on the response's content type,
+    since fetch() clients (e.g. for POST /chat/ask-stream) send `Accept: */*`.
+    """
+    
+    def __init__(self, app: ASGIApp, **gzip_options):
+        self.app = app
+        self.gzip_options = gzip_options
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        async def app_with_stream_bypass(scope: Scope, receive: Receive, gzip_send: Send):
+            bypass_gzip = False
+            
+            async def send_to_gzip_or_client(message: Message):
+                nonlocal bypass_gzip
+                if message["type"] == "http.response.start":
+                    content_type = Headers(raw=message.get("headers", [])).get("content-type", "")
+                    bypass_gzip = content_type.startswith("text/event-stream")
+                await (send if bypass_gzip else gzip_send)(message)
+            
+            await self.app(scope, receive, send_to_gzip_or_client)
+        
+        await GZipMiddleware(app_with_stream_bypass, **self.gzip_options)(scope, receive, send)
+
+
+class HealthCheck:
+    """Answer GET /health directly, ahead of every other middleware and the router."""
+    
+    BODY = b'{"status":"ok"}'
+    HEADERS = [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(BODY)).encode()),
+    ]
+    
+    def __init__(self, app: ASGIApp):
+        self.app = app
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "http" and scope["path"] == "/health":
+            await send({"type": "http.response.start", "status": 200, "headers": self.HEADERS})
+            await send({"type": "http.response.body", "body": self.BODY})
+            return
+        await self.app(scope, receive, send)
+
+
+def warm_up_services():
+    """Load the sparse embedding model ahead of the first request."""
+    try:
+        from app.services.embeddings import warm_up_sparse_model
+        warm_up_sparse_model()
+    except Exception as e:
+        print(f"Error warming up services: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Opt-in, since it loads the embedding services in every worker, including
+    # ones that only serve auth traffic. Runs in the background so startup
+    # (and /health) isn't delayed
+    warm_up = None
+    if settings.warm_up_on_startup:
+        warm_up = asyncio.create_task(asyncio.to_thread(warm_up_services))
+    yield
+    if warm_up is not None:
+        warm_up.cancel()
+
+
 app = FastAPI(
     title="Tenex Drive QA",
     description="AI-powered Q&A for Google Drive folders",
     version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
 )
 
+# Compress JSON responses of 1 KB or more
+app.add_middleware(GZipExceptEventStream, minimum_size=1024, compresslevel=5)
+
 # Allow requests from the React frontend
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=[settings.frontend_url],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+app.add_middleware(PureCORS, allow_origin=settings.frontend_url.encode())
+
+# Health checks are answered first (middleware added last runs first)
+app.add_middleware(HealthCheck)
 
 # Register routers
 app.include_router(auth.router)
@@ -25,12 +162,6 @@ app.include_router(drive.router)
 app.include_router(chat.router)
 
 
-@app.get("/health")
-def health_check():
-    """Health check endpoint to verify the server is running."""
-    return {"status": "ok"}
-
-
 @app.get("/debug/settings")
 def debug_settings():
     """Debug endpoint to check current settings (remove in production)."""
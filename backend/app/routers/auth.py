@@ -1,4 +1,4 @@
-from datetime import datetime, timedelta
+import time
 from typing import Optional, Dict
 
 from fastapi import APIRouter, Response, Request, HTTPException
@@ -6,6 +6,8 @@ from fastapi.responses import RedirectResponse
 from jose import jwt, JWTError
 
 from app.config import settings
+from app.dependencies import decode_session, resolve_session
+from app.services.session_store import SERVER_SIDE_SESSIONS, create_session, delete_session
 from app.services.google_auth import (
     get_authorization_url,
     exchange_code_for_tokens,
@@ -21,23 +23,34 @@ COOKIE_NAME = "session"
 
 
 def create_session_token(user_data: dict, google_tokens: dict) -> str:
-    """Create a JWT session token containing user info and Google tokens."""
-    expire = datetime.utcnow() + timedelta(days=ACCESS_TOKEN_EXPIRE_DAYS)
-    to_encode = {
-        "exp": expire,
-        "user": user_data,
-        "google_tokens": google_tokens,
-    }
+    """Create a JWT session token for a new session.
+    
+    With Redis configured, user info and Google tokens are kept in the
+    session store and the JWT only carries the session id. Otherwise the
+    JWT carries them itself.
+    """
+    session = {"user": user_data, "google_tokens": google_tokens}
+    expire = int(time.time()) + ACCESS_TOKEN_EXPIRE_DAYS * 24 * 60 * 60
+    to_encode = {"exp": expire}
+    
+    if SERVER_SIDE_SESSIONS:
+        to_encode["sid"] = create_session(
+            session,
+            ttl_seconds=ACCESS_TOKEN_EXPIRE_DAYS * 24 * 60 * 60,
+        )
+    else:
+        to_encode.update(session)
+    
     return jwt.encode(to_encode, settings.secret_key, algorithm=ALGORITHM)
 
 
 def decode_session_token(token: str) -> Optional[Dict]:
-    """Decode and validate a session token."""
+    """Decode and validate a session token, returning its session."""
     try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[ALGORITHM])
-        return payload
+        payload = decode_session(token)
     except JWTError:
         return None
+    return resolve_session(payload)
 
 
 @router.get("/login")
@@ -114,8 +127,14 @@ def get_current_user(request: Request):
 
 
 @router.post("/logout")
-def logout(response: Response):
-    """Clear the session cookie."""
+def logout(request: Request, response: Response):
+    """Revoke the session and clear the session cookie."""
+    token = request.cookies.get(COOKIE_NAME)
+    if token:
+        try:
+            delete_session(decode_session(token).get("sid", ""))
+        except JWTError:
+            pass
     response.delete_cookie(key=COOKIE_NAME)
     return {"message": "Logged out successfully"}
 
@@ -1,21 +1,29 @@
 """Chat endpoint for RAG-based Q&A."""
 
 import re
-from typing import List, Optional, Set, Dict
+from functools import lru_cache
+from typing import AsyncGenerator, List, Optional, Set, Dict, Tuple
 from collections import defaultdict
 
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from openai import OpenAI
 
 from app.config import settings
-from app.services.vector_store import search_chunks
-from app.services.reranker import rerank_chunks
+from app.services.sse import server_event
 
 router = APIRouter(prefix="/chat", tags=["Chat"])
 
-# Initialize OpenAI client
-client = OpenAI(api_key=settings.openai_api_key)
+
+# The OpenAI client and the search services are imported on first use, so
+# workers that only serve auth traffic never load them
+@lru_cache(maxsize=None)
+def get_openai_client():
+    """Return the shared async OpenAI client."""
+    from openai import AsyncOpenAI
+    from app.services.http_client import async_http_client
+    
+    return AsyncOpenAI(api_key=settings.openai_api_key, http_client=async_http_client)
 
 
 class ChatRequest(BaseModel):
@@ -49,6 +57,16 @@ Context from documents:
 {context}
 """
 
+# The prompt is assembled by concatenation rather than str.format
+SYSTEM_PROMPT_PREFIX, SYSTEM_PROMPT_SUFFIX = SYSTEM_PROMPT.split("{context}")
+
+CITATION_PATTERN = re.compile(r'\[([0-9]+)\]')
+
+# Length of the source snippet shown with each citation
+PREVIEW_CHARS = 200
+
+NO_RESULTS_ANSWER = "I couldn't find any relevant information in the documents to answer your question."
+
 
 def group_chunks_by_document(chunks: List[dict]) -> Dict[str, List[dict]]:
     """Group chunks by their file_id."""
@@ -75,21 +93,19 @@ def build_context_by_document(chunks: List[dict]) -> tuple[str, Dict[int, dict]]
     for doc_num, (file_id, doc_chunks) in enumerate(grouped.items(), 1):
         # Get metadata from first chunk
         first_chunk = doc_chunks[0]
-        file_name = first_chunk['metadata']['file_name']
-        web_view_link = first_chunk['metadata'].get('web_view_link')
+        metadata = first_chunk['metadata']
+        file_name = metadata['file_name']
         
         # Store document info
         doc_map[doc_num] = {
             'file_id': file_id,
             'file_name': file_name,
-            'web_view_link': web_view_link,
-            'text': first_chunk['text'][:200],  # Best chunk for preview
+            'web_view_link': metadata.get('web_view_link'),
+            'text': first_chunk['text'][:PREVIEW_CHARS],  # Best chunk for preview
         }
         
         # Combine all chunks from this document
-        chunk_texts = [chunk['text'] for chunk in doc_chunks]
-        combined_text = "\n\n".join(chunk_texts)
-        
+        combined_text = "\n\n".join([chunk['text'] for chunk in doc_chunks])
         context_parts.append(f"[{doc_num}] {file_name}:\n{combined_text}")
     
     context = "\n\n---\n\n".join(context_parts)
@@ -98,8 +114,63 @@ def build_context_by_document(chunks: List[dict]) -> tuple[str, Dict[int, dict]]
 
 def extract_citation_numbers(text: str) -> Set[int]:
     """Extract citation numbers from text like [1], [2], [3]."""
-    matches = re.findall(r'\[(\d+)\]', text)
-    return set(int(m) for m in matches)
+    return {int(m.group(1)) for m in CITATION_PATTERN.finditer(text)}
+
+
+async def retrieve_context(folder_id: str, question: str) -> Optional[Tuple[str, Dict[int, dict]]]:
+    """Retrieve, rerank and group the chunks relevant to a question.
+    
+    Returns:
+        (context, doc_map) as built by build_context_by_document, or None
+        if the search found nothing
+    """
+    from app.services.vector_store import asearch_chunks
+    from app.services.reranker import arerank_chunks
+    
+    # Hybrid search - get more candidates for reranking
+    initial_chunks = await asearch_chunks(
+        folder_id=folder_id,
+        query=question,
+        top_k=15,  # Get more for reranking
+    )
+    
+    if not initial_chunks:
+        return None
+    
+    # Rerank to get top 10 most relevant
+    reranked_chunks = await arerank_chunks(
+        query=question,
+        chunks=initial_chunks,
+        top_k=10,
+    )
+    
+    # Build context grouped by document
+    return build_context_by_document(reranked_chunks)
+
+
+def build_messages(question: str, context: str) -> List[dict]:
+    """Build the chat messages sent to GPT-4o."""
+    return [
+        {"role": "system", "content": f"{SYSTEM_PROMPT_PREFIX}{context}{SYSTEM_PROMPT_SUFFIX}"},
+        {"role": "user", "content": question},
+    ]
+
+
+def build_citations(answer: str, doc_map: Dict[int, dict]) -> List[Citation]:
+    """Build citations for the documents actually cited in the answer."""
+    citations = []
+    for doc_num in sorted(extract_citation_numbers(answer)):
+        if doc_num in doc_map:
+            doc = doc_map[doc_num]
+            # Built from our own search results, so skip validation
+            citations.append(Citation.model_construct(
+                file_name=doc['file_name'],
+                file_id=doc['file_id'],
+                web_view_link=doc['web_view_link'],
+                chunk_index=0,  # Not relevant for document-level citations
+                text=doc['text'],
+            ))
+    return citations
 
 
 @router.post("/ask", response_model=ChatResponse)
@@ -115,63 +186,26 @@ async def ask_question(body: ChatRequest):
     6. Return answer with only cited sources
     """
     try:
-        # Step 1: Hybrid search - get more candidates for reranking
-        initial_chunks = search_chunks(
-            folder_id=body.folder_id,
-            query=body.question,
-            top_k=15,  # Get more for reranking
-        )
-        
-        if not initial_chunks:
-            return ChatResponse(
-                answer="I couldn't find any relevant information in the documents to answer your question.",
-                citations=[],
-            )
-        
-        # Step 2: Rerank to get top 10 most relevant
-        reranked_chunks = rerank_chunks(
-            query=body.question,
-            chunks=initial_chunks,
-            top_k=10,
-        )
-        
-        # Step 3: Build context grouped by document
-        context, doc_map = build_context_by_document(reranked_chunks)
+        # Steps 1-3: Retrieve, rerank and group by document
+        retrieved = await retrieve_context(body.folder_id, body.question)
+        if retrieved is None:
+            return ChatResponse(answer=NO_RESULTS_ANSWER, citations=[])
+        context, doc_map = retrieved
         
         # Step 4: Call GPT-4o
-        messages = [
-            {"role": "system", "content": SYSTEM_PROMPT.format(context=context)},
-            {"role": "user", "content": body.question},
-        ]
-        
-        response = client.chat.completions.create(
+        response = await get_openai_client().chat.completions.create(
             model="gpt-4o",
-            messages=messages,
+            messages=build_messages(body.question, context),
             temperature=0.3,
             max_tokens=1000,
         )
         
         answer = response.choices[0].message.content
         
-        # Step 5: Extract which document numbers were cited
-        cited_numbers = extract_citation_numbers(answer)
-        
-        # Step 6: Build citations - only include cited documents
-        citations = []
-        for doc_num in sorted(cited_numbers):
-            if doc_num in doc_map:
-                doc = doc_map[doc_num]
-                citations.append(Citation(
-                    file_name=doc['file_name'],
-                    file_id=doc['file_id'],
-                    web_view_link=doc['web_view_link'],
-                    chunk_index=0,  # Not relevant for document-level citations
-                    text=doc['text'],
-                ))
-        
+        # Steps 5-6: Build citations - only include cited documents
         return ChatResponse(
             answer=answer,
-            citations=citations,
+            citations=build_citations(answer, doc_map),
         )
         
     except Exception as e:
@@ -179,3 +213,56 @@ async def ask_question(body: ChatRequest):
             status_code=500,
             detail=f"Error processing question: {str(e)}",
         )
+
+
+@router.post("/ask-stream")
+async def ask_question_stream(body: ChatRequest):
+    """Answer a question with the answer streamed as Server-Sent Events.
+    
+    Same pipeline as /ask, but answer tokens are pushed as `data` events
+    with a `delta` as soon as GPT-4o produces them. Citations follow in a
+    final `citations` event once the full answer is known.
+    """
+    async def generate() -> AsyncGenerator[bytes, None]:
+        try:
+            retrieved = await retrieve_context(body.folder_id, body.question)
+            if retrieved is None:
+                yield server_event({"delta": NO_RESULTS_ANSWER})
+                yield server_event([], event="citations")
+                return
+            context, doc_map = retrieved
+            
+            stream = await get_openai_client().chat.completions.create(
+                model="gpt-4o",
+                messages=build_messages(body.question, context),
+                temperature=0.3,
+                max_tokens=1000,
+                stream=True,
+            )
+            
+            answer_parts = []
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content or ""
+                if delta:
+                    answer_parts.append(delta)
+                    yield server_event({"delta": delta})
+            
+            citations = build_citations("".join(answer_parts), doc_map)
+            yield server_event([c.model_dump() for c in citations], event="citations")
+            
+        except Exception as e:
+            yield server_event(
+                {"message": f"Error processing question: {str(e)}"},
+                event="error",
+            )
+    
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+        },
+    )
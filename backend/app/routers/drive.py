@@ -1,22 +1,53 @@
-import json
-from typing import List, Optional, Generator
+import asyncio
+import hashlib
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import AsyncGenerator, Dict, List, Optional
+
+from cachetools import TTLCache
 
 from fastapi import APIRouter, HTTPException, Request
-from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from sse_starlette.sse import EventSourceResponse
 
 from app.dependencies import get_google_tokens
+from app.services.sse import server_event
 from app.services.google_drive import (
     parse_folder_id,
     list_folder_files,
     get_folder_info,
 )
-from app.services.document_processor import process_file
-from app.services.chunker import process_files_to_chunks
-from app.services.vector_store import store_chunks
 
 router = APIRouter(prefix="/drive", tags=["Google Drive"])
 
+# Max number of files downloaded from Drive at the same time (per ingest)
+MAX_CONCURRENT_DOWNLOADS = 16
+
+# Progress events are sent together at most this often (seconds), or as
+# soon as this many are waiting
+EVENT_FLUSH_INTERVAL = 0.1
+MAX_EVENTS_PER_FLUSH = 32
+
+# Folder metadata per (folder_id, access token hash), so quick re-ingests
+# of the same folder skip a Drive round trip
+_folder_info_cache = TTLCache(maxsize=512, ttl=60)
+_folder_info_lock = threading.Lock()
+
+
+def get_folder_info_cached(google_tokens: dict, folder_id: str) -> Dict:
+    """get_folder_info, cached briefly per folder and user."""
+    token_hash = hashlib.sha256(google_tokens["access_token"].encode()).hexdigest()[:32]
+    key = (folder_id, token_hash)
+    
+    with _folder_info_lock:
+        folder_info = _folder_info_cache.get(key)
+    if folder_info is None:
+        folder_info = get_folder_info(google_tokens, folder_id)
+        with _folder_info_lock:
+            _folder_info_cache[key] = folder_info
+    
+    return folder_info
+
 
 class IngestRequest(BaseModel):
     folder_url: str  # Can be a URL or folder ID
@@ -55,86 +86,184 @@ class IngestResponse(BaseModel):
     embedded: bool  # Whether chunks were stored in vector DB
 
 
-def sse_event(data: dict) -> str:
-    """Format data as SSE event."""
-    return f"data: {json.dumps(data)}\n\n"
+def to_file_info(f: dict) -> dict:
+    """Convert a Drive file listing entry to the dict process_file expects."""
+    return {
+        'id': f['id'],
+        'name': f['name'],
+        'mime_type': f['mimeType'],
+        'web_view_link': f.get('webViewLink'),
+    }
+
+
+def submit_file_processing(
+    executor: ThreadPoolExecutor,
+    google_tokens: dict,
+    file_infos: List[dict],
+) -> Dict[Future, List[dict]]:
+    """Start downloading and extracting a folder's files on the executor.
+    
+    Google Workspace files are exported together through Drive batch
+    requests; every other file is downloaded on its own. Each future
+    resolves to the list of processed file dicts for the file infos it
+    maps to.
+    """
+    from app.services.document_processor import (
+        EXPORT_MIME_TYPES,
+        process_file,
+        process_google_workspace_files,
+    )
+    
+    def process_single(file_info: dict) -> List[dict]:
+        return [process_file(google_tokens, file_info)]
+    
+    futures = {}
+    workspace_infos = [info for info in file_infos if info['mime_type'] in EXPORT_MIME_TYPES]
+    if workspace_infos:
+        future = executor.submit(process_google_workspace_files, google_tokens, workspace_infos)
+        futures[future] = workspace_infos
+    
+    for info in file_infos:
+        if info['mime_type'] not in EXPORT_MIME_TYPES:
+            futures[executor.submit(process_single, info)] = [info]
+    
+    return futures
+
+
+async def coalesce_events(events: AsyncGenerator[bytes, None]) -> AsyncGenerator[bytes, None]:
+    """Group encoded SSE events so bursts go out as a single write.
+    
+    The first waiting event starts a window of EVENT_FLUSH_INTERVAL; everything
+    produced within it (up to MAX_EVENTS_PER_FLUSH) is sent together.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    finished = object()
+    
+    async def produce():
+        try:
+            async for event in events:
+                queue.put_nowait(event)
+        finally:
+            queue.put_nowait(finished)
+    
+    producer = asyncio.create_task(produce())
+    try:
+        done = False
+        while not done:
+            event = await queue.get()
+            if event is finished:
+                break
+            
+            batch = [event]
+            deadline = loop.time() + EVENT_FLUSH_INTERVAL
+            while len(batch) < MAX_EVENTS_PER_FLUSH:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if event is finished:
+                    done = True
+                    break
+                batch.append(event)
+            
+            yield b"".join(batch)
+        
+        # Surface anything the producer raised
+        await producer
+    finally:
+        producer.cancel()
 
 
 @router.get("/ingest-stream")
-def ingest_folder_stream(folder_url: str, request: Request):
+async def ingest_folder_stream(folder_url: str, request: Request):
     """Ingest a Google Drive folder with streaming progress updates.
     
     Uses Server-Sent Events to push progress updates as each file is processed.
     """
-    # Get user's Google tokens from session
-    google_tokens = get_google_tokens(request)
+    # Imported here so workers that don't ingest never load the processing,
+    # embedding and Qdrant clients
+    from app.services.chunker import process_files_to_chunks
+    from app.services.vector_store import astore_chunks
+    
+    # Get user's Google tokens from session (in a thread, since it may
+    # read the session from Redis)
+    google_tokens = await asyncio.to_thread(get_google_tokens, request)
     
     # Parse the folder ID from URL
     folder_id = parse_folder_id(folder_url)
     if not folder_id:
-        def error_generator():
-            yield sse_event({"type": "error", "message": "Invalid Google Drive folder URL or ID"})
-        return StreamingResponse(error_generator(), media_type="text/event-stream")
+        async def error_generator() -> AsyncGenerator[bytes, None]:
+            yield server_event({"type": "error", "message": "Invalid Google Drive folder URL or ID"})
+        return EventSourceResponse(error_generator())
     
-    def generate() -> Generator[str, None, None]:
+    async def generate() -> AsyncGenerator[bytes, None]:
         try:
             # Step 1: Get folder metadata
-            yield sse_event({"type": "status", "message": "Connecting to Google Drive..."})
-            folder_info = get_folder_info(google_tokens, folder_id)
+            yield server_event({"type": "status", "message": "Connecting to Google Drive..."})
+            folder_info = await asyncio.to_thread(get_folder_info_cached, google_tokens, folder_id)
             folder_name = folder_info.get("name", "Unknown")
             
             # Step 2: List all files
-            yield sse_event({"type": "status", "message": "Listing files..."})
-            files = list_folder_files(google_tokens, folder_id)
+            yield server_event({"type": "status", "message": "Listing files..."})
+            files = await asyncio.to_thread(list_folder_files, google_tokens, folder_id)
             total_files = len(files)
             
-            yield sse_event({
+            yield server_event({
                 "type": "start",
                 "folder_name": folder_name,
                 "total_files": total_files,
             })
             
-            # Step 3: Process each file with progress updates
-            processed_files = []
-            for i, f in enumerate(files):
-                file_name = f['name']
+            # Step 3: Process files in parallel, reporting each as it finishes
+            processed_by_id = {}
+            executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_DOWNLOADS)
+            try:
+                futures = submit_file_processing(
+                    executor, google_tokens, [to_file_info(f) for f in files]
+                )
+                # All files start downloading at once; progress is counted
+                # by file_done as they finish
+                for f in files:
+                    yield server_event({
+                        "type": "file_start",
+                        "file_name": f['name'],
+                    })
                 
-                yield sse_event({
-                    "type": "file_start",
-                    "file_name": file_name,
-                    "current": i + 1,
-                    "total": total_files,
-                })
-                
-                file_info = {
-                    'id': f['id'],
-                    'name': f['name'],
-                    'mime_type': f['mimeType'],
-                    'web_view_link': f.get('webViewLink'),
-                }
-                processed = process_file(google_tokens, file_info)
-                processed_files.append(processed)
-                
-                yield sse_event({
-                    "type": "file_done",
-                    "file_name": file_name,
-                    "has_content": processed.get('has_content', False),
-                    "current": i + 1,
-                    "total": total_files,
-                })
+                for next_done in asyncio.as_completed([asyncio.wrap_future(f) for f in futures]):
+                    for processed in await next_done:
+                        processed_by_id[processed['file_id']] = processed
+                        
+                        yield server_event({
+                            "type": "file_done",
+                            "file_name": processed['file_name'],
+                            "has_content": processed.get('has_content', False),
+                            "current": len(processed_by_id),
+                            "total": total_files,
+                        })
+            finally:
+                # Don't block the event loop on downloads if the client left
+                executor.shutdown(wait=False, cancel_futures=True)
+            
+            # Keep the folder's file order for chunking
+            processed_files = [processed_by_id[f['id']] for f in files]
             
             # Step 4: Chunking
-            yield sse_event({"type": "status", "message": "Creating text chunks..."})
-            chunks = process_files_to_chunks(processed_files)
+            yield server_event({"type": "status", "message": "Creating text chunks..."})
+            chunks = await asyncio.to_thread(process_files_to_chunks, processed_files)
             
             # Step 5: Embedding
-            yield sse_event({
+            yield server_event({
                 "type": "status",
                 "message": f"Embedding {len(chunks)} chunks..."
             })
-            stored_count = store_chunks(folder_id, chunks)
+            stored_count = await astore_chunks(folder_id, chunks)
             
             # Step 6: Complete
+            content_by_id = {p['file_id']: p.get('has_content', False) for p in processed_files}
             file_list = [
                 {
                     "id": f["id"],
@@ -143,17 +272,14 @@ def ingest_folder_stream(folder_url: str, request: Request):
                     "size": f.get("size"),
                     "modified_time": f.get("modifiedTime"),
                     "web_view_link": f.get("webViewLink"),
-                    "has_content": next(
-                        (p['has_content'] for p in processed_files if p['file_id'] == f['id']),
-                        False
-                    ),
+                    "has_content": content_by_id.get(f["id"], False),
                 }
                 for f in files
             ]
             
-            processed_count = sum(1 for p in processed_files if p.get('has_content'))
+            processed_count = sum(content_by_id.values())
             
-            yield sse_event({
+            yield server_event({
                 "type": "complete",
                 "folder_id": folder_id,
                 "folder_name": folder_name,
@@ -166,23 +292,23 @@ def ingest_folder_stream(folder_url: str, request: Request):
             
         except Exception as e:
             error_msg = str(e)
-            yield sse_event({
+            yield server_event({
                 "type": "error",
                 "message": f"Error: {error_msg}",
             })
     
-    return StreamingResponse(
-        generate(),
-        media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-        },
+    # Keep-alive comments every 15s stop proxies from closing the stream
+    # during long embedding steps. The response is never gzipped, since
+    # compressed chunks would sit in the compressor instead of streaming
+    return EventSourceResponse(
+        coalesce_events(generate()),
+        ping=15,
+        headers={"X-Accel-Buffering": "no"},
     )
 
 
 @router.post("/ingest", response_model=IngestResponse)
-def ingest_folder(body: IngestRequest, request: Request):
+async def ingest_folder(body: IngestRequest, request: Request):
     """Ingest a Google Drive folder - download files, extract text, embed and store.
     
     Args:
@@ -192,8 +318,12 @@ def ingest_folder(body: IngestRequest, request: Request):
     Returns:
         Folder info, files, and embedding status
     """
-    # Get user's Google tokens from session
-    google_tokens = get_google_tokens(request)
+    from app.services.chunker import process_files_to_chunks
+    from app.services.vector_store import astore_chunks
+    
+    # Get user's Google tokens from session (in a thread, since it may
+    # read the session from Redis)
+    google_tokens = await asyncio.to_thread(get_google_tokens, request)
     
     # Parse the folder ID from URL
     folder_id = parse_folder_id(body.folder_url)
@@ -204,48 +334,50 @@ def ingest_folder(body: IngestRequest, request: Request):
         )
     
     try:
-        # Get folder metadata
-        folder_info = get_folder_info(google_tokens, folder_id)
+        # Get folder metadata and list all files in the folder
+        folder_info, files = await asyncio.gather(
+            asyncio.to_thread(get_folder_info_cached, google_tokens, folder_id),
+            asyncio.to_thread(list_folder_files, google_tokens, folder_id),
+        )
         
-        # List all files in the folder
-        files = list_folder_files(google_tokens, folder_id)
+        # Process files concurrently (download and extract text). A dedicated
+        # pool, since the default one can be smaller than the download limit
+        executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_DOWNLOADS)
+        try:
+            futures = submit_file_processing(
+                executor, google_tokens, [to_file_info(f) for f in files]
+            )
+            results = await asyncio.gather(*[asyncio.wrap_future(f) for f in futures])
+        finally:
+            # Don't block the event loop on downloads after a failure or cancel
+            executor.shutdown(wait=False, cancel_futures=True)
         
-        # Process each file (download and extract text)
-        processed_files = []
-        for f in files:
-            file_info = {
-                'id': f['id'],
-                'name': f['name'],
-                'mime_type': f['mimeType'],
-                'web_view_link': f.get('webViewLink'),
-            }
-            processed = process_file(google_tokens, file_info)
-            processed_files.append(processed)
+        processed_by_id = {p['file_id']: p for group in results for p in group}
+        processed_files = [processed_by_id[f['id']] for f in files]
         
         # Create chunks from all processed files
-        chunks = process_files_to_chunks(processed_files)
+        chunks = await asyncio.to_thread(process_files_to_chunks, processed_files)
         
         # Store chunks in Qdrant with embeddings
-        stored_count = store_chunks(folder_id, chunks)
+        stored_count = await astore_chunks(folder_id, chunks)
         
         # Transform to response format
+        # Drive metadata is already well-formed, so skip per-item validation
+        content_by_id = {p['file_id']: p.get('has_content', False) for p in processed_files}
         file_list = [
-            FileInfo(
+            FileInfo.model_construct(
                 id=f["id"],
                 name=f["name"],
                 mime_type=f["mimeType"],
                 size=f.get("size"),
                 modified_time=f.get("modifiedTime"),
                 web_view_link=f.get("webViewLink"),
-                has_content=next(
-                    (p['has_content'] for p in processed_files if p['file_id'] == f['id']),
-                    False
-                ),
+                has_content=content_by_id.get(f["id"], False),
             )
             for f in files
         ]
         
-        processed_count = sum(1 for p in processed_files if p.get('has_content'))
+        processed_count = sum(content_by_id.values())
         
         return IngestResponse(
             folder_id=folder_id,
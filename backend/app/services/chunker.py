@@ -1,77 +1,101 @@
 """Split text into chunks with metadata for RAG."""
 
-from typing import List, Dict
+import re
+from bisect import bisect_right
+from typing import List, Dict, Tuple
 
+# Sentence-ending punctuation followed by a space or newline
+SENTENCE_BOUNDARY = re.compile(r'[.!?][ \n]')
 
-def chunk_text(
+
+def compute_chunk_ranges(
     text: str,
     chunk_size: int = 800,
     chunk_overlap: int = 100,
-) -> List[str]:
-    """Split text into overlapping chunks.
+) -> List[Tuple[int, int]]:
+    """Find the (start, end) offsets of overlapping chunks of a text.
+    
+    Chunks end at a sentence boundary within their last 20% where possible,
+    otherwise at a word boundary, and never start or end with whitespace.
     
     Args:
-        text: The text to split
+        text: The text to split (already stripped)
         chunk_size: Target size for each chunk in characters
         chunk_overlap: Number of characters to overlap between chunks
         
     Returns:
-        List of text chunks
+        List of (start, end) offsets, one per non-empty chunk
     """
-    if not text or not text.strip():
-        return []
-    
-    # Clean up the text
-    text = text.strip()
+    # Positions just after every sentence-ending punctuation mark, found in
+    # one pass so each chunk only needs a binary search
+    sentence_ends = [m.start() + 1 for m in SENTENCE_BOUNDARY.finditer(text)]
     
-    # If text is shorter than chunk size, return as single chunk
-    if len(text) <= chunk_size:
-        return [text]
-    
-    chunks = []
+    ranges = []
     start = 0
     
     while start < len(text):
         # Calculate end position
-        end = start + chunk_size
+        end = min(start + chunk_size, len(text))
         
         # If this is not the last chunk, try to break at a sentence or word boundary
         if end < len(text):
             # Look for sentence boundary (., !, ?) within the last 20% of the chunk
             search_start = end - int(chunk_size * 0.2)
-            search_region = text[search_start:end]
-            
-            # Find last sentence boundary
-            last_period = max(
-                search_region.rfind('. '),
-                search_region.rfind('! '),
-                search_region.rfind('? '),
-                search_region.rfind('.\n'),
-                search_region.rfind('!\n'),
-                search_region.rfind('?\n'),
-            )
             
-            if last_period != -1:
-                end = search_start + last_period + 1
+            # Find last sentence boundary that ends before `end`
+            i = bisect_right(sentence_ends, end - 1)
+            if i and sentence_ends[i - 1] > search_start:
+                end = sentence_ends[i - 1]
             else:
                 # Fall back to word boundary
-                last_space = search_region.rfind(' ')
+                last_space = text.rfind(' ', search_start, end)
                 if last_space != -1:
-                    end = search_start + last_space
-        
-        # Extract chunk
-        chunk = text[start:end].strip()
-        if chunk:
-            chunks.append(chunk)
+                    end = last_space
         
-        # Move start position (with overlap)
-        start = end - chunk_overlap
+        # Trim whitespace by index rather than with .strip()
+        lo, hi = start, end
+        while lo < hi and text[lo].isspace():
+            lo += 1
+        while hi > lo and text[hi - 1].isspace():
+            hi -= 1
+        if lo < hi:
+            ranges.append((lo, hi))
         
-        # Prevent infinite loop
-        if start >= len(text) - chunk_overlap:
+        if end >= len(text):
             break
+        
+        # Move start position (with overlap), always moving forward
+        start = max(end - chunk_overlap, start + 1)
+    
+    return ranges
+
+
+def chunk_text(
+    text: str,
+    chunk_size: int = 800,
+    chunk_overlap: int = 100,
+) -> List[str]:
+    """Split text into overlapping chunks.
+    
+    Args:
+        text: The text to split
+        chunk_size: Target size for each chunk in characters
+        chunk_overlap: Number of characters to overlap between chunks
+        
+    Returns:
+        List of text chunks
+    """
+    if not text or not text.strip():
+        return []
+    
+    # Clean up the text
+    text = text.strip()
+    
+    # If text is shorter than chunk size, return as single chunk
+    if len(text) <= chunk_size:
+        return [text]
     
-    return chunks
+    return [text[lo:hi] for lo, hi in compute_chunk_ranges(text, chunk_size, chunk_overlap)]
 
 
 def create_chunks_with_metadata(
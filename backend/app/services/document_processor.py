@@ -1,23 +1,30 @@
 """Download and extract text from Google Drive files."""
 
-from typing import Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+import csv
 import io
+import tempfile
+import threading
 
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseDownload
+from app.services.google_drive import download_file_media, get_drive_service
 
+# Google Workspace file types and the format each one is exported as
+EXPORT_MIME_TYPES = {
+    'application/vnd.google-apps.document': 'text/plain',
+    'application/vnd.google-apps.spreadsheet': 'text/csv',
+    'application/vnd.google-apps.presentation': 'text/plain',
+}
 
-def get_drive_service(google_tokens: dict):
-    """Create a Google Drive API service."""
-    credentials = Credentials(
-        token=google_tokens.get("access_token"),
-        refresh_token=google_tokens.get("refresh_token"),
-        token_uri=google_tokens.get("token_uri", "https://oauth2.googleapis.com/token"),
-        client_id=google_tokens.get("client_id"),
-        client_secret=google_tokens.get("client_secret"),
-    )
-    return build('drive', 'v3', credentials=credentials)
+# Drive accepts at most 100 calls per batch request
+MAX_BATCH_SIZE = 100
+
+# Exports retried one by one after a batch failure, run this many at a time
+MAX_CONCURRENT_FALLBACK_EXPORTS = 8
+
+# PyMuPDF isn't thread-safe and files are processed in parallel threads,
+# so PDFs are parsed one at a time while downloads still overlap
+_pdf_lock = threading.Lock()
 
 
 def download_file_content(google_tokens: dict, file_id: str, mime_type: str) -> Optional[str]:
@@ -46,10 +53,10 @@ def download_file_content(google_tokens: dict, file_id: str, mime_type: str) ->
         
         # Handle regular files
         elif mime_type == 'application/pdf':
-            return download_and_parse_pdf(service, file_id)
+            return download_and_parse_pdf(google_tokens, file_id)
         
         elif mime_type in ['text/plain', 'text/markdown', 'text/csv']:
-            return download_text_file(service, file_id)
+            return download_text_file(google_tokens, file_id)
         
         else:
             # Unsupported file type
@@ -85,28 +92,25 @@ def export_google_sheet(service, file_id: str) -> str:
     else:
         csv_text = str(content)
     
-    # Convert CSV to more readable format
-    lines = csv_text.strip().split('\n')
-    if not lines:
+    return csv_to_text(csv_text)
+
+
+def csv_to_text(csv_text: str) -> str:
+    """Convert exported CSV to a readable "Column: value" text layout."""
+    rows = list(csv.reader(io.StringIO(csv_text.strip())))
+    if not rows:
         return ""
     
-    # Parse header and rows
-    result_lines = []
-    header = lines[0].split(',') if lines else []
+    # Rows can be wider than the header; name the extra columns by position
+    header = rows[0]
+    width = max(len(row) for row in rows)
+    col_names = header + [f"Column {j + 1}" for j in range(len(header), width)]
     
-    for i, line in enumerate(lines):
-        if i == 0:
-            result_lines.append(f"Columns: {', '.join(header)}")
-            result_lines.append("")
-        else:
-            values = line.split(',')
-            row_text = []
-            for j, val in enumerate(values):
-                col_name = header[j] if j < len(header) else f"Column {j+1}"
-                if val.strip():
-                    row_text.append(f"{col_name}: {val.strip()}")
-            if row_text:
-                result_lines.append(f"Row {i}: {'; '.join(row_text)}")
+    result_lines = [f"Columns: {', '.join(header)}", ""]
+    for i, row in enumerate(rows[1:], 1):
+        row_text = [f"{name}: {val}" for name, val in zip(col_names, map(str.strip, row)) if val]
+        if row_text:
+            result_lines.append(f"Row {i}: {'; '.join(row_text)}")
     
     return '\n'.join(result_lines)
 
@@ -123,21 +127,15 @@ def export_google_slides(service, file_id: str) -> str:
     return str(content)
 
 
-def download_text_file(service, file_id: str) -> str:
+def download_text_file(google_tokens: dict, file_id: str) -> str:
     """Download a plain text file."""
-    request = service.files().get_media(fileId=file_id)
     file_buffer = io.BytesIO()
-    downloader = MediaIoBaseDownload(file_buffer, request)
-    
-    done = False
-    while not done:
-        _, done = downloader.next_chunk()
+    download_file_media(google_tokens, file_id, file_buffer)
     
-    file_buffer.seek(0)
-    return file_buffer.read().decode('utf-8')
+    return file_buffer.getvalue().decode('utf-8')
 
 
-def download_and_parse_pdf(service, file_id: str) -> str:
+def download_and_parse_pdf(google_tokens: dict, file_id: str) -> str:
     """Download a PDF and extract text using PyMuPDF."""
     try:
         import fitz  # PyMuPDF
@@ -145,30 +143,104 @@ def download_and_parse_pdf(service, file_id: str) -> str:
         print("PyMuPDF not installed. Skipping PDF processing.")
         return None
     
-    # Download PDF
-    request = service.files().get_media(fileId=file_id)
-    file_buffer = io.BytesIO()
-    downloader = MediaIoBaseDownload(file_buffer, request)
+    text_parts = []
     
-    done = False
-    while not done:
-        _, done = downloader.next_chunk()
+    # Download PDF to disk so PyMuPDF reads the file itself instead of
+    # a full in-memory copy of it
+    with tempfile.NamedTemporaryFile(suffix='.pdf') as pdf_file:
+        download_file_media(google_tokens, file_id, pdf_file)
+        pdf_file.flush()
+        
+        # Extract text from PDF
+        with _pdf_lock, fitz.open(pdf_file.name, filetype="pdf") as doc:
+            for page_num, page in enumerate(doc, 1):
+                text = page.get_text()
+                if text.strip():
+                    text_parts.append(f"[Page {page_num}]\n{text}")
     
-    # Extract text from PDF
-    file_buffer.seek(0)
-    pdf_bytes = file_buffer.read()
+    return '\n\n'.join(text_parts)
+
+
+def batch_export_google_files(google_tokens: dict, file_infos: List[Dict]) -> Dict[str, Optional[str]]:
+    """Export Google Workspace files to text using Drive batch requests.
     
-    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-    text_parts = []
+    Up to MAX_BATCH_SIZE exports share a single HTTP request. Files whose
+    export fails inside the batch are retried individually, in parallel.
     
-    for page_num in range(len(doc)):
-        page = doc.load_page(page_num)
-        text = page.get_text()
-        if text.strip():
-            text_parts.append(f"[Page {page_num + 1}]\n{text}")
+    Args:
+        google_tokens: User's Google OAuth tokens
+        file_infos: File metadata dicts with id and a Workspace mime_type
+        
+    Returns:
+        Mapping of file ID to extracted text (None if it couldn't be exported)
+    """
+    service = get_drive_service(google_tokens)
+    mime_types = {info['id']: info['mime_type'] for info in file_infos}
+    contents = {}
     
-    doc.close()
-    return '\n\n'.join(text_parts)
+    def on_response(request_id, response, exception):
+        if exception is not None:
+            print(f"Batch export failed for file {request_id}: {exception}")
+            return
+        text = response.decode('utf-8') if isinstance(response, bytes) else str(response)
+        if mime_types[request_id] == 'application/vnd.google-apps.spreadsheet':
+            text = csv_to_text(text)
+        contents[request_id] = text
+    
+    for i in range(0, len(file_infos), MAX_BATCH_SIZE):
+        batch = service.new_batch_http_request(callback=on_response)
+        for info in file_infos[i:i + MAX_BATCH_SIZE]:
+            batch.add(
+                service.files().export(
+                    fileId=info['id'],
+                    mimeType=EXPORT_MIME_TYPES[info['mime_type']],
+                ),
+                request_id=info['id'],
+            )
+        try:
+            batch.execute()
+        except Exception as e:
+            print(f"Batch export request failed: {e}")
+    
+    # Fall back to individual exports for anything the batch didn't return.
+    # After a whole-batch failure that can be most of the folder, so several
+    # run at once
+    missing = [file_id for file_id in mime_types if file_id not in contents]
+    if missing:
+        with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_FALLBACK_EXPORTS) as executor:
+            exported = executor.map(
+                lambda file_id: download_file_content(google_tokens, file_id, mime_types[file_id]),
+                missing,
+            )
+            contents.update(zip(missing, exported))
+    
+    return contents
+
+
+def build_processed_file(file_info: Dict, content: Optional[str]) -> Dict:
+    """Combine file metadata and extracted text into a processed file dict."""
+    return {
+        'file_id': file_info['id'],
+        'file_name': file_info['name'],
+        'mime_type': file_info['mime_type'],
+        'content': content,
+        'has_content': content is not None and len(content.strip()) > 0,
+        'web_view_link': file_info.get('web_view_link'),
+    }
+
+
+def process_google_workspace_files(google_tokens: dict, file_infos: List[Dict]) -> List[Dict]:
+    """Process Google Workspace files together via batched exports.
+    
+    Args:
+        google_tokens: User's Google OAuth tokens
+        file_infos: File metadata dicts whose mime_type is in EXPORT_MIME_TYPES
+        
+    Returns:
+        List of processed file dicts, in the same order as file_infos
+    """
+    contents = batch_export_google_files(google_tokens, file_infos)
+    return [build_processed_file(info, contents.get(info['id'])) for info in file_infos]
 
 
 def process_file(google_tokens: dict, file_info: Dict) -> Dict:
@@ -186,12 +258,5 @@ def process_file(google_tokens: dict, file_info: Dict) -> Dict:
     
     content = download_file_content(google_tokens, file_id, mime_type)
     
-    return {
-        'file_id': file_id,
-        'file_name': file_info['name'],
-        'mime_type': mime_type,
-        'content': content,
-        'has_content': content is not None and len(content.strip()) > 0,
-        'web_view_link': file_info.get('web_view_link'),
-    }
+    return build_processed_file(file_info, content)
 
@@ -1,14 +1,22 @@
 """Generate embeddings using OpenAI (dense) and FastEmbed (sparse)."""
 
-from typing import List, Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Tuple
+import hashlib
+import threading
 
-from openai import OpenAI
+import numpy as np
+from cachetools import LRUCache
+from openai import OpenAI, AsyncOpenAI
 from fastembed import SparseTextEmbedding
 
 from app.config import settings
+from app.services.batcher import MicroBatcher
+from app.services.http_client import http_client, async_http_client
 
-# Initialize OpenAI client
-client = OpenAI(api_key=settings.openai_api_key)
+# Initialize OpenAI clients
+client = OpenAI(api_key=settings.openai_api_key, http_client=http_client)
+aclient = AsyncOpenAI(api_key=settings.openai_api_key, http_client=async_http_client)
 
 # Initialize sparse embedding model (SPLADE)
 sparse_model = SparseTextEmbedding(model_name="Qdrant/bm25")
@@ -17,94 +25,264 @@ sparse_model = SparseTextEmbedding(model_name="Qdrant/bm25")
 EMBEDDING_MODEL = "text-embedding-3-small"
 EMBEDDING_DIMENSIONS = 1536
 
+# Texts per embeddings request, and requests in flight at once during
+# ingest (keep within the account's tokens-per-minute limit)
+EMBEDDING_BATCH_SIZE = 100
+MAX_CONCURRENT_EMBEDDING_REQUESTS = 8
+
+# Sparse batches at least this large are tokenized across all CPU cores.
+# Smaller ones stay in-process, since starting the workers costs more
+SPARSE_PARALLEL_MIN_TEXTS = 5000
+
+# Dense embeddings by model and text hash, so re-ingesting a folder only
+# embeds chunks that changed. Stored as float32 arrays (~6 KB each).
+_embedding_cache = LRUCache(maxsize=10000)
+_embedding_cache_lock = threading.Lock()
+
+# Sparse query embeddings by query text, stored as (indices, values) tuples
+# so callers can't modify the cached entries
+_sparse_query_cache = LRUCache(maxsize=1024)
+_sparse_query_cache_lock = threading.Lock()
+
+
+def _embedding_cache_key(text: str) -> bytes:
+    # Whitespace is collapsed first, so chunks that only differ in line breaks
+    # or indentation (e.g. boilerplate exported from different file types)
+    # share one embedding
+    normalized = " ".join(text.split())
+    return EMBEDDING_MODEL.encode() + hashlib.sha256(normalized.encode()).digest()[:16]
+
+
+def _get_cached_embedding(text: str) -> Optional[np.ndarray]:
+    with _embedding_cache_lock:
+        return _embedding_cache.get(_embedding_cache_key(text))
+
+
+def _cache_embedding(text: str, embedding: List[float]):
+    vector = np.asarray(embedding, dtype=np.float32)
+    with _embedding_cache_lock:
+        _embedding_cache[_embedding_cache_key(text)] = vector
+
+
+def find_uncached_texts(
+    texts: List[str],
+) -> Tuple[Dict[int, np.ndarray], List[int], List[int], Dict[bytes, str]]:
+    """Split texts into those with a cached embedding and those without.
+    
+    Texts that share a cache key (duplicate chunks such as repeated
+    boilerplate) only need to be embedded once.
+    
+    Returns:
+        cached: Mapping of text index to its cached embedding
+        miss_indices: Indices of texts that still need embedding
+        miss_slots: For each of miss_indices, its position in miss_texts
+        miss_texts: Unique texts to embed, by cache key (in first-seen order)
+    """
+    cached = {}
+    miss_indices = []
+    miss_slots = []
+    miss_texts = {}
+    slots = {}
+    
+    with _embedding_cache_lock:
+        for i, text in enumerate(texts):
+            key = _embedding_cache_key(text)
+            vector = _embedding_cache.get(key)
+            if vector is not None:
+                cached[i] = vector
+                continue
+            
+            slot = slots.get(key)
+            if slot is None:
+                slot = slots[key] = len(miss_texts)
+                miss_texts[key] = text
+            miss_indices.append(i)
+            miss_slots.append(slot)
+    
+    return cached, miss_indices, miss_slots, miss_texts
+
 
 def get_embedding(text: str) -> List[float]:
     """Get dense embedding for a single text.
     
+    Repeated texts (e.g. the same question asked again) come from the cache.
+    
     Args:
         text: The text to embed
         
     Returns:
         List of floats representing the embedding vector
     """
+    vector = _get_cached_embedding(text)
+    if vector is not None:
+        return vector.tolist()
+    
     response = client.embeddings.create(
         input=text,
         model=EMBEDDING_MODEL,
     )
-    return response.data[0].embedding
+    embedding = response.data[0].embedding
+    _cache_embedding(text, embedding)
+    return embedding
+
+
+def _embed_texts(texts: List[str]) -> np.ndarray:
+    """Embed one batch of texts with a single API call, in input order."""
+    response = client.embeddings.create(
+        input=texts,
+        model=EMBEDDING_MODEL,
+    )
+    
+    # Sort by index to maintain order
+    sorted_data = sorted(response.data, key=lambda x: x.index)
+    return np.array([item.embedding for item in sorted_data], dtype=np.float32)
 
 
-def get_embeddings_batch(texts: List[str]) -> List[List[float]]:
-    """Get dense embeddings for multiple texts in a single API call.
+def get_embeddings_batch(texts: List[str]) -> np.ndarray:
+    """Get dense embeddings for many texts, sending uncached ones in concurrent batches.
+    
+    Texts embedded before (and still in the cache) aren't sent to OpenAI,
+    and duplicate texts are only sent once. The rest are sent in batches,
+    several requests at a time.
     
     Args:
         texts: List of texts to embed
         
     Returns:
-        List of embedding vectors
+        float32 array of shape (len(texts), EMBEDDING_DIMENSIONS), one row
+        per text
     """
+    embeddings = np.empty((len(texts), EMBEDDING_DIMENSIONS), dtype=np.float32)
     if not texts:
-        return []
+        return embeddings
+    
+    cached, miss_indices, miss_slots, miss_texts = find_uncached_texts(texts)
+    for i, vector in cached.items():
+        embeddings[i] = vector
     
     # OpenAI allows up to 2048 texts per batch
     # We'll process in smaller batches to be safe
-    batch_size = 100
-    all_embeddings = []
+    unique_texts = list(miss_texts.values())
+    batches = [
+        unique_texts[i:i + EMBEDDING_BATCH_SIZE]
+        for i in range(0, len(unique_texts), EMBEDDING_BATCH_SIZE)
+    ]
     
-    for i in range(0, len(texts), batch_size):
-        batch = texts[i:i + batch_size]
-        
-        response = client.embeddings.create(
-            input=batch,
-            model=EMBEDDING_MODEL,
-        )
+    if not batches:
+        return embeddings
+    
+    if len(batches) == 1:
+        new_embeddings = _embed_texts(batches[0])
+    else:
+        with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_EMBEDDING_REQUESTS) as executor:
+            new_embeddings = np.concatenate(list(executor.map(_embed_texts, batches)))
+    
+    # Splice new embeddings back into the original order (duplicates included)
+    embeddings[miss_indices] = new_embeddings[miss_slots]
+    
+    # Cache copies of the rows, so cached vectors don't keep the whole batch alive
+    with _embedding_cache_lock:
+        for key, embedding in zip(miss_texts, new_embeddings):
+            _embedding_cache[key] = embedding.copy()
+    
+    return embeddings
+
+
+async def aget_embeddings_batch(texts: List[str]) -> List[List[float]]:
+    """Get dense embeddings for a small batch of texts in one async API call.
+    
+    Args:
+        texts: List of texts to embed (at most a few hundred)
         
-        # Sort by index to maintain order
-        sorted_data = sorted(response.data, key=lambda x: x.index)
-        batch_embeddings = [item.embedding for item in sorted_data]
-        all_embeddings.extend(batch_embeddings)
+    Returns:
+        List of embedding vectors
+    """
+    if not texts:
+        return []
     
-    return all_embeddings
+    response = await aclient.embeddings.create(
+        input=texts,
+        model=EMBEDDING_MODEL,
+    )
+    
+    sorted_data = sorted(response.data, key=lambda x: x.index)
+    return [item.embedding for item in sorted_data]
+
+
+# Query embeddings from concurrent requests are sent to OpenAI together
+query_embedding_batcher = MicroBatcher(aget_embeddings_batch, max_batch_size=16, max_wait_ms=10)
+
+
+async def aget_query_embedding(query: str) -> List[float]:
+    """Async get_embedding for search queries.
+    
+    Cache misses are batched with other concurrent queries; the result is
+    cached the same way as get_embedding.
+    """
+    vector = _get_cached_embedding(query)
+    if vector is not None:
+        return vector.tolist()
+    
+    embedding = await query_embedding_batcher.submit(query)
+    _cache_embedding(query, embedding)
+    return embedding
+
+
+def _sparse_arrays(emb) -> Dict[str, np.ndarray]:
+    # FastEmbed's BM25 returns int64 indices and float64 values; Qdrant stores
+    # uint32 indices and float32 values, so narrow them once here
+    return {
+        'indices': emb.indices.astype(np.uint32, copy=False),
+        'values': emb.values.astype(np.float32, copy=False),
+    }
 
 
 def get_sparse_embedding(text: str) -> Dict:
     """Get sparse embedding for a single text using BM25.
     
+    Repeated texts come from a small in-process cache.
+    
     Args:
         text: The text to embed
         
     Returns:
         Dict with 'indices' and 'values' for sparse vector
     """
-    embeddings = list(sparse_model.embed([text]))
-    if embeddings:
-        emb = embeddings[0]
-        return {
-            'indices': emb.indices.tolist(),
-            'values': emb.values.tolist(),
-        }
-    return {'indices': [], 'values': []}
+    with _sparse_query_cache_lock:
+        cached = _sparse_query_cache.get(text)
+    
+    if cached is None:
+        embeddings = list(sparse_model.embed([text]))
+        if embeddings:
+            emb = _sparse_arrays(embeddings[0])
+            cached = (tuple(emb['indices'].tolist()), tuple(emb['values'].tolist()))
+        else:
+            cached = ((), ())
+        with _sparse_query_cache_lock:
+            _sparse_query_cache[text] = cached
+    
+    indices, values = cached
+    return {'indices': list(indices), 'values': list(values)}
 
 
-def get_sparse_embeddings_batch(texts: List[str]) -> List[Dict]:
+def get_sparse_embeddings_batch(texts: List[str]) -> List[Dict[str, np.ndarray]]:
     """Get sparse embeddings for multiple texts.
     
     Args:
         texts: List of texts to embed
         
     Returns:
-        List of dicts with 'indices' and 'values' for sparse vectors
+        List of dicts with 'indices' (uint32) and 'values' (float32) numpy
+        arrays for sparse vectors (convert with .tolist() where plain lists
+        are needed)
     """
     if not texts:
         return []
     
-    embeddings = list(sparse_model.embed(texts))
-    
-    result = []
-    for emb in embeddings:
-        result.append({
-            'indices': emb.indices.tolist(),
-            'values': emb.values.tolist(),
-        })
-    
-    return result
+    parallel = 0 if len(texts) >= SPARSE_PARALLEL_MIN_TEXTS else None
+    return [_sparse_arrays(emb) for emb in sparse_model.embed(texts, parallel=parallel)]
+
+
+def warm_up_sparse_model():
+    """Run the sparse model once so the first real request doesn't pay its setup."""
+    list(sparse_model.embed(["warmup"]))
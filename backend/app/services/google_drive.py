@@ -1,12 +1,42 @@
 import re
-from typing import List, Dict, Optional
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import BinaryIO, List, Dict, Optional
 
+from cachetools import LRUCache
+from google.auth.transport.requests import Request as GoogleAuthRequest
 from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build
 
 from app.config import settings
+from app.services.http_client import http_client
 
+# Max parent folders combined into one files.list query
+MAX_PARENTS_PER_QUERY = 50
 
+# Max files.list queries running at the same time
+MAX_CONCURRENT_LISTINGS = 6
+
+# A bare folder ID, or a folder ID inside a Drive URL
+FOLDER_ID_PATTERN = re.compile(r'[\w-]{21,}')
+FOLDER_URL_PATTERN = re.compile(
+    r'drive\.google\.com/(?:drive/(?:u/\d+/)?folders/|.*[?&]id=)(?P<id>[a-zA-Z0-9_-]+)'
+)
+
+# Drive services built per thread, since httplib2 connections aren't thread-safe
+MAX_SERVICES_PER_THREAD = 8
+_thread_services = threading.local()
+
+# File contents are downloaded directly over the shared HTTP/2 client, so
+# parallel downloads share connections instead of one httplib2 socket each
+DRIVE_FILES_URL = "https://www.googleapis.com/drive/v3/files"
+MEDIA_CHUNK_SIZE = 1024 * 1024
+MEDIA_RETRIES = 3
+
+
+@lru_cache(maxsize=1024)
 def parse_folder_id(url_or_id: str) -> Optional[str]:
     """Extract folder ID from a Google Drive URL or return the ID if already an ID.
     
@@ -17,33 +47,84 @@ def parse_folder_id(url_or_id: str) -> Optional[str]:
     - Just the FOLDER_ID directly
     """
     # If it's already just an ID (no slashes or dots), return it
-    if re.match(r'^[\w-]+$', url_or_id) and len(url_or_id) > 20:
+    if FOLDER_ID_PATTERN.fullmatch(url_or_id):
         return url_or_id
     
     # Try to extract from URL
-    patterns = [
-        r'drive\.google\.com/drive/(?:u/\d+/)?folders/([a-zA-Z0-9_-]+)',
-        r'drive\.google\.com/.*[?&]id=([a-zA-Z0-9_-]+)',
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, url_or_id)
-        if match:
-            return match.group(1)
-    
-    return None
+    match = FOLDER_URL_PATTERN.search(url_or_id)
+    return match.group('id') if match else None
 
 
-def get_drive_service(google_tokens: dict):
-    """Create a Google Drive API service using the user's Google tokens."""
-    credentials = Credentials(
+def get_credentials(google_tokens: dict) -> Credentials:
+    """Build OAuth credentials from the user's Google tokens."""
+    return Credentials(
         token=google_tokens.get("access_token"),
         refresh_token=google_tokens.get("refresh_token"),
         token_uri=google_tokens.get("token_uri", "https://oauth2.googleapis.com/token"),
         client_id=google_tokens.get("client_id"),
         client_secret=google_tokens.get("client_secret"),
     )
-    return build('drive', 'v3', credentials=credentials)
+
+
+def get_drive_service(google_tokens: dict):
+    """Get a Google Drive API service using the user's Google tokens.
+    
+    Services are reused per thread and access token, so the discovery
+    document is only parsed once per worker thread instead of per call.
+    """
+    services = getattr(_thread_services, 'services', None)
+    if services is None:
+        services = _thread_services.services = LRUCache(maxsize=MAX_SERVICES_PER_THREAD)
+    
+    access_token = google_tokens.get("access_token")
+    service = services.get(access_token)
+    if service is None:
+        service = build(
+            'drive', 'v3',
+            credentials=get_credentials(google_tokens),
+            cache_discovery=False,
+            static_discovery=True,
+        )
+        services[access_token] = service
+    return service
+
+
+def download_file_media(google_tokens: dict, file_id: str, out: BinaryIO) -> None:
+    """Download a file's contents from Google Drive into a binary file object.
+    
+    An expired access token is refreshed once, and rate limit or server
+    errors are retried with backoff before any content is written.
+    
+    Args:
+        google_tokens: The user's Google OAuth tokens dict
+        file_id: The Google Drive file ID
+        out: Writable binary file object to stream the contents into
+    """
+    credentials = get_credentials(google_tokens)
+    refreshed = False
+    attempt = 0
+    
+    while True:
+        with http_client.stream(
+            "GET",
+            f"{DRIVE_FILES_URL}/{file_id}",
+            params={"alt": "media"},
+            headers={"Authorization": f"Bearer {credentials.token}"},
+        ) as response:
+            if response.status_code == 401 and not refreshed and credentials.refresh_token:
+                credentials.refresh(GoogleAuthRequest())
+                refreshed = True
+                continue
+            
+            if (response.status_code == 429 or response.status_code >= 500) and attempt < MEDIA_RETRIES:
+                attempt += 1
+                time.sleep(2 ** attempt)
+                continue
+            
+            response.raise_for_status()
+            for chunk in response.iter_bytes(MEDIA_CHUNK_SIZE):
+                out.write(chunk)
+            return
 
 
 def list_folder_files(google_tokens: dict, folder_id: str) -> List[Dict]:
@@ -56,17 +137,22 @@ def list_folder_files(google_tokens: dict, folder_id: str) -> List[Dict]:
     Returns:
         List of file metadata dicts
     """
+    return list_folders_files(google_tokens, [folder_id])
+
+
+def _list_children(google_tokens: dict, folder_ids: List[str]) -> List[Dict]:
+    """Page through the files whose parent is any of the given folders."""
     service = get_drive_service(google_tokens)
+    parents = " or ".join(f"'{folder_id}' in parents" for folder_id in folder_ids)
     
     files = []
     page_token = None
     
     while True:
-        # Query for files in this folder
         response = service.files().list(
-            q=f"'{folder_id}' in parents and trashed = false",
+            q=f"({parents}) and trashed = false",
             spaces='drive',
-            fields='nextPageToken, files(id, name, mimeType, size, modifiedTime, webViewLink)',
+            fields='nextPageToken, files(id, name, mimeType, size, modifiedTime, webViewLink, parents)',
             pageToken=page_token,
             pageSize=100,
         ).execute()
@@ -80,6 +166,32 @@ def list_folder_files(google_tokens: dict, folder_id: str) -> List[Dict]:
     return files
 
 
+def list_folders_files(google_tokens: dict, folder_ids: List[str]) -> List[Dict]:
+    """List all files in several Google Drive folders.
+    
+    Folders are combined MAX_PARENTS_PER_QUERY at a time into a single
+    `'a' in parents or 'b' in parents ...` query, and the queries run in
+    parallel. Each file's `parents` field tells which folder it came from.
+    
+    Args:
+        google_tokens: The user's Google OAuth tokens dict
+        folder_ids: The Google Drive folder IDs
+        
+    Returns:
+        List of file metadata dicts
+    """
+    groups = [
+        folder_ids[i:i + MAX_PARENTS_PER_QUERY]
+        for i in range(0, len(folder_ids), MAX_PARENTS_PER_QUERY)
+    ]
+    if len(groups) <= 1:
+        return _list_children(google_tokens, folder_ids) if folder_ids else []
+    
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_LISTINGS) as executor:
+        results = executor.map(lambda group: _list_children(google_tokens, group), groups)
+        return [f for group_files in results for f in group_files]
+
+
 def get_folder_info(google_tokens: dict, folder_id: str) -> Dict:
     """Get metadata about a folder.
     
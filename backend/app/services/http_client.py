@@ -0,0 +1,13 @@
+"""Shared HTTP connection pools for the OpenAI, Cohere and Drive download clients.
+
+Connections are kept alive and multiplexed over HTTP/2, so concurrent API
+calls reuse a handful of TLS connections instead of opening new ones.
+"""
+
+import httpx
+
+HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=50)
+HTTP_TIMEOUT = httpx.Timeout(60.0, connect=5.0)
+
+http_client = httpx.Client(http2=True, limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+async_http_client = httpx.AsyncClient(http2=True, limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
@@ -1,13 +1,28 @@
 """Rerank chunks using Cohere for better relevance."""
 
+import asyncio
 from typing import List, Dict
 
 import cohere
 
 from app.config import settings
+from app.services.http_client import http_client, async_http_client
 
-# Initialize Cohere client
-co = cohere.Client(settings.cohere_api_key)
+# Initialize Cohere clients
+co = cohere.Client(settings.cohere_api_key, httpx_client=http_client)
+aco = cohere.AsyncClient(settings.cohere_api_key, httpx_client=async_http_client)
+
+RERANK_MODEL = "rerank-english-v3.0"
+
+
+def _apply_rerank_results(chunks: List[Dict], results) -> List[Dict]:
+    """Reorder chunks according to Cohere rerank results, attaching scores."""
+    reranked = []
+    for result in results:
+        chunk = chunks[result.index].copy()
+        chunk['rerank_score'] = result.relevance_score
+        reranked.append(chunk)
+    return reranked
 
 
 def rerank_chunks(
@@ -37,18 +52,62 @@ def rerank_chunks(
     
     # Call Cohere rerank
     response = co.rerank(
-        model="rerank-english-v3.0",
+        model=RERANK_MODEL,
         query=query,
         documents=documents,
         top_n=top_k,
     )
     
     # Get reranked chunks with scores
-    reranked = []
-    for result in response.results:
-        chunk = chunks[result.index].copy()
-        chunk['rerank_score'] = result.relevance_score
-        reranked.append(chunk)
+    return _apply_rerank_results(chunks, response.results)
+
+
+async def arerank_chunks(
+    query: str,
+    chunks: List[Dict],
+    top_k: int = 5,
+) -> List[Dict]:
+    """Async variant of rerank_chunks using Cohere's async client."""
+    if not chunks:
+        return []
     
-    return reranked
+    if len(chunks) <= top_k:
+        return chunks
+    
+    response = await aco.rerank(
+        model=RERANK_MODEL,
+        query=query,
+        documents=[chunk['text'] for chunk in chunks],
+        top_n=top_k,
+    )
+    
+    return _apply_rerank_results(chunks, response.results)
 
+
+async def rerank_chunks_batch(
+    queries: List[str],
+    chunks_per_query: List[List[Dict]],
+    top_k: int = 5,
+) -> List[List[Dict]]:
+    """Rerank candidate chunks for many queries concurrently.
+    
+    Identical query/candidate pairs are only sent to Cohere once.
+    
+    Args:
+        queries: The questions to rerank for
+        chunks_per_query: Candidate chunks for each query, aligned with queries
+        top_k: Number of top chunks to return per query
+        
+    Returns:
+        List of reranked chunk lists, in the same order as queries
+    """
+    requests = {}
+    keys = []
+    for query, chunks in zip(queries, chunks_per_query):
+        key = (query, tuple(chunk['text'] for chunk in chunks))
+        if key not in requests:
+            requests[key] = arerank_chunks(query, chunks, top_k)
+        keys.append(key)
+    
+    results = dict(zip(requests, await asyncio.gather(*requests.values())))
+    return [results[key] for key in keys]
@@ -0,0 +1,77 @@
+"""Server-side session storage in Redis, so the session cookie only carries an id.
+
+Without REDIS_URL there is no shared store: the signed session cookie keeps
+carrying the session itself (see create_session_token), so sessions survive
+restarts and work across workers either way.
+"""
+
+import json
+import secrets
+import time
+from typing import Dict, Optional
+
+from cachetools import TLRUCache
+
+from app.config import settings
+
+SESSION_KEY_PREFIX = "sess:"
+
+# How long a session read from Redis is served from local memory
+REDIS_CACHE_SECONDS = 60
+
+if settings.redis_url:
+    import redis
+    _redis = redis.Redis.from_url(settings.redis_url)
+else:
+    _redis = None
+
+# Whether sessions are kept here rather than in the cookie
+SERVER_SIDE_SESSIONS = _redis is not None
+
+
+def _expires_at(_key, value, _now):
+    return value[0]
+
+
+# sid -> (expires_at, session), a short-lived read-through cache in front of Redis
+_local_sessions = TLRUCache(maxsize=10000, ttu=_expires_at, timer=time.time)
+
+
+def create_session(data: Dict, ttl_seconds: int) -> str:
+    """Store session data and return a new random session id.
+    
+    Raises:
+        RuntimeError: If no Redis is configured (see SERVER_SIDE_SESSIONS)
+    """
+    if _redis is None:
+        raise RuntimeError("Server-side sessions require REDIS_URL")
+    
+    sid = secrets.token_urlsafe(32)
+    _redis.set(f"{SESSION_KEY_PREFIX}{sid}", json.dumps(data), ex=ttl_seconds)
+    _local_sessions[sid] = (time.time() + min(ttl_seconds, REDIS_CACHE_SECONDS), data)
+    return sid
+
+
+def get_session(sid: str) -> Optional[Dict]:
+    """Look up session data by id, or None if it doesn't exist or expired."""
+    cached = _local_sessions.get(sid)
+    if cached is not None:
+        return cached[1]
+    
+    if _redis is None:
+        return None
+    
+    raw = _redis.get(f"{SESSION_KEY_PREFIX}{sid}")
+    if raw is None:
+        return None
+    
+    data = json.loads(raw)
+    _local_sessions[sid] = (time.time() + REDIS_CACHE_SECONDS, data)
+    return data
+
+
+def delete_session(sid: str) -> None:
+    """Revoke a session."""
+    _local_sessions.pop(sid, None)
+    if _redis is not None:
+        _redis.delete(f"{SESSION_KEY_PREFIX}{sid}")
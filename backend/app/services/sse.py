@@ -0,0 +1,11 @@
+"""Server-Sent Event formatting shared by the streaming endpoints."""
+
+from typing import Any, Optional
+
+import orjson
+
+
+def server_event(data: Any, event: Optional[str] = None) -> bytes:
+    """Format data as an encoded SSE event, optionally with an event name."""
+    prefix = b"event: " + event.encode() + b"\n" if event else b""
+    return prefix + b"data: " + orjson.dumps(data) + b"\n\n"
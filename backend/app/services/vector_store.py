@@ -1,9 +1,18 @@
 """Store and search vectors in Qdrant with hybrid search."""
 
-from typing import List, Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Tuple
+import asyncio
+import hashlib
+import logging
+import threading
+import time
 import uuid
 
-from qdrant_client import QdrantClient, models
+import grpc
+import numpy as np
+from qdrant_client import AsyncQdrantClient, QdrantClient, models
+from qdrant_client.http.exceptions import UnexpectedResponse
 from qdrant_client.http.models import (
     Distance,
     VectorParams,
@@ -15,6 +24,12 @@ from qdrant_client.http.models import (
     Prefetch,
     FusionQuery,
     Fusion,
+    HnswConfigDiff,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    SearchParams,
+    QuantizationSearchParams,
 )
 
 from app.config import settings
@@ -23,25 +38,223 @@ from app.services.embeddings import (
     get_embeddings_batch,
     get_sparse_embedding,
     get_sparse_embeddings_batch,
+    aget_query_embedding,
     EMBEDDING_DIMENSIONS,
 )
+from app.services.http_client import HTTP_LIMITS
 
-# Initialize Qdrant client
+logger = logging.getLogger(__name__)
+
+# Initialize Qdrant client. Requests go over gRPC (port 6334), whose
+# protobuf encoding of float vectors is much smaller than REST JSON
 qdrant_client = QdrantClient(
     url=settings.qdrant_url,
     api_key=settings.qdrant_api_key,
+    prefer_grpc=settings.qdrant_prefer_grpc,
+    grpc_port=6334,
+    timeout=60,
+    # REST calls (and all calls when gRPC is off) share one keep-alive pool
+    # over HTTP/2; the client's default pool closes every connection after use
+    http2=True,
+    limits=HTTP_LIMITS,
+)
+
+# Same settings, for the async ingest path
+async_qdrant_client = AsyncQdrantClient(
+    url=settings.qdrant_url,
+    api_key=settings.qdrant_api_key,
+    prefer_grpc=settings.qdrant_prefer_grpc,
+    grpc_port=6334,
+    timeout=60,
+    http2=True,
+    limits=HTTP_LIMITS,
 )
 
 # Vector names
 DENSE_VECTOR_NAME = "dense"
 SPARSE_VECTOR_NAME = "sparse"
 
+# Dense vectors are quantized to int8 and kept in RAM; searches traverse
+# the quantized HNSW graph, then rescore the oversampled candidates with
+# the original vectors (which can live on disk, see VECTORS_ON_DISK)
+DENSE_QUANTIZATION = ScalarQuantization(
+    scalar=ScalarQuantizationConfig(
+        type=ScalarType.INT8,
+        quantile=0.99,
+        always_ram=True,
+    ),
+)
+DENSE_SEARCH_PARAMS = SearchParams(
+    hnsw_ef=settings.hnsw_ef_search,
+    quantization=QuantizationSearchParams(rescore=True, oversampling=2.0),
+)
+
+
+# Content hashes looked up per Qdrant request when reusing stored vectors
+HASH_LOOKUP_BATCH_SIZE = 1000
+
+# Points read per request when diffing a folder against what's stored
+SIGNATURE_SCROLL_BATCH_SIZE = 1000
+
+# Points per upsert request, and upsert requests in flight at once
+UPSERT_BATCH_SIZE = 256
+MAX_CONCURRENT_UPSERTS = 4
+
+# Indexed payload fields, used to filter by file and to look up chunks by content
+PAYLOAD_INDEXES = {
+    'file_id': models.PayloadSchemaType.KEYWORD,
+    'content_hash': models.PayloadSchemaType.KEYWORD,
+    'chunk_index': models.PayloadSchemaType.INTEGER,
+}
+
+# Payload fields returned as a search result's metadata
+CHUNK_METADATA_FIELDS = ('file_id', 'file_name', 'chunk_index', 'total_chunks', 'web_view_link')
+
+# Dense (OpenAI) and sparse (local BM25) embeddings are computed side by side
+_embedding_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="embed")
+
+# Collections known to exist, so ingests skip the existence check. Another
+# worker may delete one, so ingests recreate it when it turns out missing
+_known_collections = set()
+_known_collections_lock = threading.Lock()
+
+# Folders whose semantic query cache collection is known to exist. Another
+# worker may drop it (on re-ingest), so writes recreate it when it's missing
+_query_cache_collections = set()
+
+
+def is_not_found_error(error: Exception) -> bool:
+    """Whether a Qdrant error means the collection (or point) doesn't exist."""
+    if isinstance(error, UnexpectedResponse):
+        return error.status_code == 404
+    if isinstance(error, grpc.RpcError):
+        return error.code() == grpc.StatusCode.NOT_FOUND
+    # Local mode (QdrantClient(":memory:") in development) raises ValueError
+    return isinstance(error, ValueError) and "not found" in str(error)
+
 
 def get_collection_name(folder_id: str) -> str:
     """Generate a collection name from folder ID."""
     return f"folder_{folder_id.replace('-', '_')}"
 
 
+def get_query_cache_name(folder_id: str) -> str:
+    """Generate the semantic query cache collection name from folder ID."""
+    return f"query_cache_{folder_id.replace('-', '_')}"
+
+
+def semantic_cache_lookup(folder_id: str, dense_query: List[float], top_k: int) -> Optional[List[Dict]]:
+    """Find results cached for a question similar enough to this one.
+    
+    Args:
+        folder_id: Google Drive folder ID
+        dense_query: Dense embedding of the question
+        top_k: Number of results the search asks for
+        
+    Returns:
+        The cached chunks, or None on a miss
+    """
+    try:
+        results = qdrant_client.query_points(
+            collection_name=get_query_cache_name(folder_id),
+            query=dense_query,
+            query_filter=models.Filter(must=[
+                models.FieldCondition(key='top_k', match=models.MatchValue(value=top_k)),
+                models.FieldCondition(
+                    key='created_at',
+                    range=models.Range(gte=time.time() - settings.semantic_cache_ttl_seconds),
+                ),
+            ]),
+            score_threshold=settings.semantic_cache_threshold,
+            limit=1,
+            with_payload=True,
+        )
+    except Exception as e:
+        # A missing collection just means nothing was cached yet
+        if not is_not_found_error(e):
+            logger.exception("Semantic cache lookup failed for folder %s", folder_id)
+        return None
+    
+    if results.points:
+        return results.points[0].payload['chunks']
+    return None
+
+
+def _ensure_query_cache_collection(folder_id: str) -> str:
+    """Create the folder's query cache collection unless it's known to exist."""
+    collection_name = get_query_cache_name(folder_id)
+    if folder_id in _query_cache_collections:
+        return collection_name
+    
+    if not qdrant_client.collection_exists(collection_name):
+        try:
+            qdrant_client.create_collection(
+                collection_name=collection_name,
+                vectors_config=VectorParams(size=EMBEDDING_DIMENSIONS, distance=Distance.COSINE),
+            )
+        except Exception:
+            # Another worker may have created it in the meantime
+            if not qdrant_client.collection_exists(collection_name):
+                raise
+    
+    _query_cache_collections.add(folder_id)
+    return collection_name
+
+
+def semantic_cache_store(folder_id: str, dense_query: List[float], top_k: int, chunks: List[Dict]):
+    """Cache search results under the question's dense embedding.
+    
+    Expired entries are pruned on each write.
+    """
+    now = time.time()
+    point = PointStruct(
+        id=str(uuid.uuid4()),
+        vector=dense_query,
+        payload={'top_k': top_k, 'created_at': now, 'chunks': chunks},
+    )
+    
+    try:
+        collection_name = _ensure_query_cache_collection(folder_id)
+        try:
+            qdrant_client.upsert(collection_name=collection_name, points=[point], wait=False)
+        except Exception as e:
+            if not is_not_found_error(e):
+                raise
+            # Dropped by another worker (e.g. after a re-ingest) since this
+            # one last saw it, so recreate it and try once more
+            _query_cache_collections.discard(folder_id)
+            collection_name = _ensure_query_cache_collection(folder_id)
+            qdrant_client.upsert(collection_name=collection_name, points=[point], wait=False)
+        
+        qdrant_client.delete(
+            collection_name=collection_name,
+            points_selector=models.FilterSelector(filter=models.Filter(must=[
+                models.FieldCondition(
+                    key='created_at',
+                    range=models.Range(lt=now - settings.semantic_cache_ttl_seconds),
+                ),
+            ])),
+            wait=False,
+        )
+    except Exception:
+        logger.exception("Error caching search results for folder %s", folder_id)
+
+
+def clear_semantic_cache(folder_id: str):
+    """Drop a folder's cached search results (e.g. after re-ingesting it).
+    
+    Failures are logged rather than raised, since the ingest that triggered
+    the clear has already succeeded; until it's retried, searches may still
+    be answered from the old results.
+    """
+    _query_cache_collections.discard(folder_id)
+    try:
+        qdrant_client.delete_collection(collection_name=get_query_cache_name(folder_id))
+    except Exception as e:
+        if not is_not_found_error(e):
+            logger.exception("Error clearing semantic cache for folder %s", folder_id)
+
+
 def create_collection_if_not_exists(folder_id: str) -> str:
     """Create a Qdrant collection for a folder if it doesn't exist.
     
@@ -53,41 +266,276 @@ def create_collection_if_not_exists(folder_id: str) -> str:
     """
     collection_name = get_collection_name(folder_id)
     
-    # Check if collection exists
-    collections = qdrant_client.get_collections().collections
-    collection_names = [c.name for c in collections]
+    with _known_collections_lock:
+        if collection_name in _known_collections:
+            return collection_name
     
-    if collection_name not in collection_names:
+    # Check if collection exists
+    if not qdrant_client.collection_exists(collection_name):
         qdrant_client.create_collection(
             collection_name=collection_name,
             vectors_config={
                 DENSE_VECTOR_NAME: VectorParams(
                     size=EMBEDDING_DIMENSIONS,
                     distance=Distance.COSINE,
+                    on_disk=settings.vectors_on_disk,
                 ),
             },
             sparse_vectors_config={
                 SPARSE_VECTOR_NAME: SparseVectorParams(),
             },
+            hnsw_config=HnswConfigDiff(
+                m=settings.hnsw_m,
+                ef_construct=settings.hnsw_ef_construct,
+            ),
+            # Segments below this size (in KB of vectors) are searched by
+            # brute force, so small folders skip building an index entirely
+            # and bulk ingests don't rebuild it while points stream in
+            optimizers_config=models.OptimizersConfigDiff(
+                indexing_threshold=settings.indexing_threshold,
+            ),
+            quantization_config=DENSE_QUANTIZATION,
+        )
+    elif qdrant_client.get_collection(collection_name).config.quantization_config is None:
+        # Collections created before quantization was enabled get it now;
+        # Qdrant builds the quantized copies in the background
+        qdrant_client.update_collection(
+            collection_name=collection_name,
+            quantization_config=DENSE_QUANTIZATION,
+        )
+    
+    # Creating an index that already exists is a no-op, so collections made
+    # before an index was added get it on their next ingest
+    for field_name, field_schema in PAYLOAD_INDEXES.items():
+        qdrant_client.create_payload_index(
+            collection_name=collection_name,
+            field_name=field_name,
+            field_schema=field_schema,
         )
     
+    with _known_collections_lock:
+        _known_collections.add(collection_name)
+    
     return collection_name
 
 
+def content_hash(text: str) -> str:
+    """Hash chunk text for matching it against already stored chunks."""
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def find_stored_vectors(collection_name: str, hashes: List[str]) -> Dict[str, Dict]:
+    """Fetch the vectors of already stored chunks by content hash.
+    
+    Args:
+        collection_name: Qdrant collection to look in
+        hashes: Content hashes of the chunks about to be stored
+        
+    Returns:
+        Mapping of content hash to its stored named vectors
+    """
+    unique_hashes = list(dict.fromkeys(hashes))
+    stored = {}
+    
+    for i in range(0, len(unique_hashes), HASH_LOOKUP_BATCH_SIZE):
+        batch = unique_hashes[i:i + HASH_LOOKUP_BATCH_SIZE]
+        offset = None
+        while True:
+            points, offset = qdrant_client.scroll(
+                collection_name=collection_name,
+                scroll_filter=models.Filter(must=[
+                    models.FieldCondition(key='content_hash', match=models.MatchAny(any=batch)),
+                ]),
+                with_payload=['content_hash'],
+                with_vectors=True,
+                limit=len(batch),
+                offset=offset,
+            )
+            for point in points:
+                stored[point.payload['content_hash']] = point.vector
+            if offset is None:
+                break
+    
+    return stored
+
+
 def delete_collection(folder_id: str) -> bool:
-    """Delete a collection for a folder."""
+    """Delete a collection for a folder.
+    
+    Returns:
+        True if the collection was deleted, False if it didn't exist. Other
+        Qdrant errors are raised, so callers can tell them apart and retry
+    """
     collection_name = get_collection_name(folder_id)
+    clear_semantic_cache(folder_id)
     
-    try:
-        qdrant_client.delete_collection(collection_name=collection_name)
-        return True
-    except Exception:
+    with _known_collections_lock:
+        _known_collections.discard(collection_name)
+    
+    if not qdrant_client.collection_exists(collection_name):
         return False
+    
+    qdrant_client.delete_collection(collection_name=collection_name)
+    return True
+
+
+def chunk_point_id(file_id: str, chunk_index: int) -> str:
+    """Deterministic point ID for a chunk, so re-ingesting replaces it in place."""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{file_id}:{chunk_index}"))
+
+
+def chunk_payload(chunk: Dict, chunk_hash: str) -> Dict:
+    """Build the Qdrant payload stored with a chunk."""
+    return {
+        'text': chunk['text'],
+        'content_hash': chunk_hash,
+        'file_id': chunk['metadata']['file_id'],
+        'file_name': chunk['metadata']['file_name'],
+        'chunk_index': chunk['metadata']['chunk_index'],
+        'total_chunks': chunk['metadata']['total_chunks'],
+        'web_view_link': chunk['metadata'].get('web_view_link'),
+    }
+
+
+def fetch_existing_signatures(collection_name: str) -> Dict[Tuple[str, int], Tuple[str, Dict]]:
+    """Fetch the ID and payload (without text) of every stored chunk.
+    
+    Args:
+        collection_name: Qdrant collection to read
+        
+    Returns:
+        Mapping of (file_id, chunk_index) to (point ID, payload)
+    """
+    signatures = {}
+    offset = None
+    
+    while True:
+        points, offset = qdrant_client.scroll(
+            collection_name=collection_name,
+            with_payload=models.PayloadSelectorExclude(exclude=['text']),
+            with_vectors=False,
+            limit=SIGNATURE_SCROLL_BATCH_SIZE,
+            offset=offset,
+        )
+        for point in points:
+            key = (point.payload.get('file_id'), point.payload.get('chunk_index'))
+            signatures[key] = (point.id, point.payload)
+        if offset is None:
+            break
+    
+    return signatures
+
+
+def prepare_chunk_upserts(folder_id: str, chunks: List[Dict]) -> Tuple[str, List[models.Batch], List]:
+    """Work out what store_chunks needs to write, embedding new chunks.
+    
+    Args:
+        folder_id: Google Drive folder ID
+        chunks: List of chunk dicts with 'text' and 'metadata'
+        
+    Returns:
+        collection_name: The folder's collection (created if needed)
+        batches: Upsert batches for new and changed chunks
+        stale_ids: IDs of stored chunks that no longer exist in the folder
+    """
+    # Create collection if needed
+    collection_name = create_collection_if_not_exists(folder_id)
+    try:
+        existing = fetch_existing_signatures(collection_name)
+    except Exception as e:
+        if not is_not_found_error(e):
+            raise
+        # Deleted by another worker since this one last saw it
+        with _known_collections_lock:
+            _known_collections.discard(collection_name)
+        collection_name = create_collection_if_not_exists(folder_id)
+        existing = fetch_existing_signatures(collection_name)
+    
+    # Work out which chunks are new or changed
+    hashes = [content_hash(chunk['text']) for chunk in chunks]
+    payloads = [chunk_payload(chunk, h) for chunk, h in zip(chunks, hashes)]
+    
+    changed = []
+    point_ids = []
+    for i, payload in enumerate(payloads):
+        key = (payload['file_id'], payload['chunk_index'])
+        point_id, stored_payload = existing.pop(key, (None, None))
+        if stored_payload is not None and all(
+            stored_payload.get(field) == value
+            for field, value in payload.items() if field != 'text'
+        ):
+            continue
+        changed.append(i)
+        point_ids.append(point_id or chunk_point_id(*key))
+    
+    # Whatever is left no longer exists in the folder
+    stale_ids = [point_id for point_id, _ in existing.values()]
+    
+    if not changed and not stale_ids:
+        return collection_name, [], []
+    
+    # Reuse the vectors of chunks that were already stored under another
+    # position (e.g. after an edit shifted later chunks) and only embed the rest
+    changed_hashes = [hashes[i] for i in changed]
+    try:
+        stored_vectors = find_stored_vectors(collection_name, changed_hashes)
+    except Exception as e:
+        # Only a collection dropped mid-ingest leaves nothing to reuse; any
+        # other failure would silently re-embed the whole folder
+        if not is_not_found_error(e):
+            raise
+        logger.warning(
+            "Collection %s disappeared while looking up stored vectors; embedding all %d changed chunks",
+            collection_name, len(changed_hashes),
+        )
+        stored_vectors = {}
+    
+    vectors = [stored_vectors.get(h) for h in changed_hashes]
+    new_positions = [j for j, vector in enumerate(vectors) if vector is None]
+    new_texts = [chunks[changed[j]]['text'] for j in new_positions]
+    
+    # Get both dense and sparse embeddings, concurrently
+    dense_future = _embedding_executor.submit(get_embeddings_batch, new_texts)
+    sparse_embeddings = get_sparse_embeddings_batch(new_texts)
+    dense_embeddings = dense_future.result()
+    
+    for j, dense_emb, sparse_emb in zip(new_positions, dense_embeddings, sparse_embeddings):
+        vectors[j] = {
+            DENSE_VECTOR_NAME: dense_emb.tolist(),
+            SPARSE_VECTOR_NAME: SparseVector(
+                indices=sparse_emb['indices'].tolist(),
+                values=sparse_emb['values'].tolist(),
+            ),
+        }
+    
+    # Upsert in column batches (ids, vectors and payloads as parallel lists)
+    # rather than one PointStruct per chunk. Existing IDs are replaced in place
+    changed_payloads = [payloads[i] for i in changed]
+    dense_vectors = [vector[DENSE_VECTOR_NAME] for vector in vectors]
+    sparse_vectors = [vector[SPARSE_VECTOR_NAME] for vector in vectors]
+    
+    batches = [
+        models.Batch(
+            ids=point_ids[i:i + UPSERT_BATCH_SIZE],
+            vectors={
+                DENSE_VECTOR_NAME: dense_vectors[i:i + UPSERT_BATCH_SIZE],
+                SPARSE_VECTOR_NAME: sparse_vectors[i:i + UPSERT_BATCH_SIZE],
+            },
+            payloads=changed_payloads[i:i + UPSERT_BATCH_SIZE],
+        )
+        for i in range(0, len(point_ids), UPSERT_BATCH_SIZE)
+    ]
+    
+    return collection_name, batches, stale_ids
 
 
 def store_chunks(folder_id: str, chunks: List[Dict]) -> int:
     """Store chunks with dense and sparse embeddings in Qdrant.
     
+    Only the difference to what's already stored is written: unchanged
+    chunks are left alone, changed ones are replaced in place, and chunks
+    that no longer exist are deleted.
+    
     Args:
         folder_id: Google Drive folder ID
         chunks: List of chunk dicts with 'text' and 'metadata'
@@ -98,60 +546,184 @@ def store_chunks(folder_id: str, chunks: List[Dict]) -> int:
     if not chunks:
         return 0
     
-    # Create collection if needed
-    collection_name = create_collection_if_not_exists(folder_id)
+    collection_name, batches, stale_ids = prepare_chunk_upserts(folder_id, chunks)
     
-    # Clear existing points
-    try:
+    # Several batches at a time
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_UPSERTS) as executor:
+        futures = [
+            executor.submit(qdrant_client.upsert, collection_name=collection_name, points=batch)
+            for batch in batches
+        ]
+        for future in futures:
+            future.result()
+    
+    # Delete stale chunks last, so their vectors could still be reused above
+    if stale_ids:
         qdrant_client.delete(
             collection_name=collection_name,
-            points_selector=models.FilterSelector(
-                filter=models.Filter(must=[])
-            ),
-        )
-    except Exception:
-        pass
-    
-    # Extract texts
-    texts = [chunk['text'] for chunk in chunks]
-    
-    # Get both dense and sparse embeddings
-    dense_embeddings = get_embeddings_batch(texts)
-    sparse_embeddings = get_sparse_embeddings_batch(texts)
-    
-    # Create points
-    points = []
-    for i, (chunk, dense_emb, sparse_emb) in enumerate(zip(chunks, dense_embeddings, sparse_embeddings)):
-        point = PointStruct(
-            id=str(uuid.uuid4()),
-            vector={
-                DENSE_VECTOR_NAME: dense_emb,
-                SPARSE_VECTOR_NAME: SparseVector(
-                    indices=sparse_emb['indices'],
-                    values=sparse_emb['values'],
-                ),
-            },
-            payload={
-                'text': chunk['text'],
-                'file_id': chunk['metadata']['file_id'],
-                'file_name': chunk['metadata']['file_name'],
-                'chunk_index': chunk['metadata']['chunk_index'],
-                'total_chunks': chunk['metadata']['total_chunks'],
-                'web_view_link': chunk['metadata'].get('web_view_link'),
-            }
+            points_selector=models.PointIdsList(points=stale_ids),
         )
-        points.append(point)
     
-    # Upsert in batches
-    batch_size = 100
-    for i in range(0, len(points), batch_size):
-        batch = points[i:i + batch_size]
-        qdrant_client.upsert(
+    # Cached search results refer to the old contents. Cleared only once the
+    # new contents are written, so searches in between can't cache stale ones
+    if settings.enable_semantic_cache and (batches or stale_ids):
+        clear_semantic_cache(folder_id)
+    
+    return len(chunks)
+
+
+async def astore_chunks(folder_id: str, chunks: List[Dict]) -> int:
+    """Async store_chunks, for use from request handlers.
+    
+    The diff and embeddings are worked out in a worker thread; the upserts
+    then go through the async Qdrant client, several batches at a time.
+    """
+    if not chunks:
+        return 0
+    
+    collection_name, batches, stale_ids = await asyncio.to_thread(
+        prepare_chunk_upserts, folder_id, chunks
+    )
+    
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_UPSERTS)
+    
+    async def upsert(batch: models.Batch):
+        async with semaphore:
+            await async_qdrant_client.upsert(collection_name=collection_name, points=batch)
+    
+    await asyncio.gather(*[upsert(batch) for batch in batches])
+    
+    # Delete stale chunks last, so their vectors could still be reused above
+    if stale_ids:
+        await async_qdrant_client.delete(
             collection_name=collection_name,
-            points=batch,
+            points_selector=models.PointIdsList(points=stale_ids),
         )
     
-    return len(points)
+    # Cached search results refer to the old contents (see store_chunks)
+    if settings.enable_semantic_cache and (batches or stale_ids):
+        await asyncio.to_thread(clear_semantic_cache, folder_id)
+    
+    return len(chunks)
+
+
+def format_point(point) -> Dict:
+    """Convert a scored Qdrant point into a chunk dict with metadata."""
+    payload = point.payload
+    return {
+        'text': payload['text'],
+        'score': point.score,
+        'metadata': {field: payload.get(field) for field in CHUNK_METADATA_FIELDS},
+    }
+
+
+def _hybrid_prefetch(dense_query: List[float], sparse_query: Dict, limit: int) -> List[Prefetch]:
+    """Dense and sparse candidate searches for one query, to be fused."""
+    return [
+        Prefetch(
+            query=dense_query,
+            using=DENSE_VECTOR_NAME,
+            params=DENSE_SEARCH_PARAMS,
+            limit=limit,
+        ),
+        Prefetch(
+            query=SparseVector(
+                indices=sparse_query['indices'],
+                values=sparse_query['values'],
+            ),
+            using=SPARSE_VECTOR_NAME,
+            limit=limit,
+        ),
+    ]
+
+
+def fuse_rrf(result_lists: List[List], k: int, limit: int) -> List[Dict]:
+    """Fuse ranked point lists with Reciprocal Rank Fusion, score = sum(1 / (k + rank)).
+    
+    Args:
+        result_lists: Lists of scored points, each ordered best first
+        k: RRF constant; larger values flatten the difference between ranks
+        limit: Number of fused results to return
+        
+    Returns:
+        Formatted chunks ordered by fused score
+    """
+    points_by_id = {}
+    ids = []
+    ranks = []
+    for results in result_lists:
+        for rank, point in enumerate(results, 1):
+            point_id = str(point.id)
+            points_by_id.setdefault(point_id, point)
+            ids.append(point_id)
+            ranks.append(rank)
+    
+    if not ids:
+        return []
+    
+    unique_ids, inverse = np.unique(np.array(ids), return_inverse=True)
+    scores = np.bincount(inverse, weights=1.0 / (k + np.array(ranks)))
+    
+    fused = []
+    for i in np.argsort(-scores, kind='stable')[:limit]:
+        chunk = format_point(points_by_id[unique_ids[i]])
+        chunk['score'] = float(scores[i])
+        fused.append(chunk)
+    
+    return fused
+
+
+def _client_rrf_query(
+    collection_name: str,
+    dense_query: List[float],
+    sparse_query: Dict,
+    top_k: int,
+    k: int,
+) -> List[Dict]:
+    """Run the dense and sparse searches in one batch request and fuse them here."""
+    dense_results, sparse_results = qdrant_client.query_batch_points(
+        collection_name=collection_name,
+        requests=[
+            models.QueryRequest(
+                query=dense_query,
+                using=DENSE_VECTOR_NAME,
+                params=DENSE_SEARCH_PARAMS,
+                limit=top_k * 2,
+                with_payload=True,
+            ),
+            models.QueryRequest(
+                query=SparseVector(
+                    indices=sparse_query['indices'],
+                    values=sparse_query['values'],
+                ),
+                using=SPARSE_VECTOR_NAME,
+                limit=top_k * 2,
+                with_payload=True,
+            ),
+        ],
+    )
+    return fuse_rrf([dense_results.points, sparse_results.points], k, top_k)
+
+
+def _hybrid_query(
+    collection_name: str,
+    dense_query: List[float],
+    sparse_query: Dict,
+    top_k: int,
+) -> List[Dict]:
+    """Run a hybrid query with Reciprocal Rank Fusion and format the results."""
+    if settings.rrf_k is not None:
+        return _client_rrf_query(collection_name, dense_query, sparse_query, top_k, settings.rrf_k)
+    
+    results = qdrant_client.query_points(
+        collection_name=collection_name,
+        prefetch=_hybrid_prefetch(dense_query, sparse_query, top_k * 2),
+        query=FusionQuery(fusion=Fusion.RRF),
+        limit=top_k,
+    )
+    
+    # Format results
+    return [format_point(point) for point in results.points]
 
 
 def search_chunks(
@@ -161,6 +733,9 @@ def search_chunks(
 ) -> List[Dict]:
     """Hybrid search: combine dense and sparse search with RRF fusion.
     
+    With the semantic cache enabled, results for a near-identical earlier
+    question are returned without running the search.
+    
     Args:
         folder_id: Google Drive folder ID
         query: Search query text
@@ -171,45 +746,94 @@ def search_chunks(
     """
     collection_name = get_collection_name(folder_id)
     
-    # Get both query embeddings
-    dense_query = get_embedding(query)
+    # Get both query embeddings, concurrently
+    dense_future = _embedding_executor.submit(get_embedding, query)
     sparse_query = get_sparse_embedding(query)
+    dense_query = dense_future.result()
+    
+    if settings.enable_semantic_cache:
+        cached = semantic_cache_lookup(folder_id, dense_query, top_k)
+        if cached is not None:
+            return cached
+    
+    chunks = _hybrid_query(collection_name, dense_query, sparse_query, top_k)
+    if settings.enable_semantic_cache:
+        semantic_cache_store(folder_id, dense_query, top_k, chunks)
+    return chunks
+
+
+def search_chunks_multi(
+    folder_id: str,
+    queries: List[str],
+    top_k: int = 5,
+) -> List[Dict]:
+    """Hybrid search for several phrasings of one question in a single request.
+    
+    Each query's dense and sparse results are fused with RRF inside a nested
+    prefetch, and the per-query results are fused again with RRF, all on the
+    Qdrant server in one round trip.
+    
+    Args:
+        folder_id: Google Drive folder ID
+        queries: Search query texts (e.g. reformulations of a question)
+        top_k: Number of results to return
+        
+    Returns:
+        List of matching chunks with scores
+    """
+    if not queries:
+        return []
+    
+    collection_name = get_collection_name(folder_id)
+    
+    # Dense embeddings for all queries in one API call, alongside the sparse ones
+    dense_future = _embedding_executor.submit(get_embeddings_batch, queries)
+    sparse_queries = [get_sparse_embedding(query) for query in queries]
+    dense_queries = dense_future.result()
     
-    # Hybrid search with Reciprocal Rank Fusion
     results = qdrant_client.query_points(
         collection_name=collection_name,
         prefetch=[
             Prefetch(
-                query=dense_query,
-                using=DENSE_VECTOR_NAME,
-                limit=top_k * 2,
-            ),
-            Prefetch(
-                query=SparseVector(
-                    indices=sparse_query['indices'],
-                    values=sparse_query['values'],
-                ),
-                using=SPARSE_VECTOR_NAME,
+                prefetch=_hybrid_prefetch(dense_query.tolist(), sparse_query, top_k * 2),
+                query=FusionQuery(fusion=Fusion.RRF),
                 limit=top_k * 2,
-            ),
+            )
+            for dense_query, sparse_query in zip(dense_queries, sparse_queries)
         ],
         query=FusionQuery(fusion=Fusion.RRF),
         limit=top_k,
     )
     
-    # Format results
-    chunks = []
-    for point in results.points:
-        chunks.append({
-            'text': point.payload['text'],
-            'score': point.score,
-            'metadata': {
-                'file_id': point.payload['file_id'],
-                'file_name': point.payload['file_name'],
-                'chunk_index': point.payload['chunk_index'],
-                'total_chunks': point.payload['total_chunks'],
-                'web_view_link': point.payload.get('web_view_link'),
-            }
-        })
+    return [format_point(point) for point in results.points]
+
+
+async def asearch_chunks(
+    folder_id: str,
+    query: str,
+    top_k: int = 5,
+) -> List[Dict]:
+    """Async variant of search_chunks.
     
+    The dense and sparse query embeddings are computed concurrently, and
+    blocking calls run in worker threads so the event loop stays free.
+    Dense query embeddings from concurrent searches are batched together.
+    """
+    collection_name = get_collection_name(folder_id)
+    
+    dense_query, sparse_query = await asyncio.gather(
+        aget_query_embedding(query),
+        asyncio.to_thread(get_sparse_embedding, query),
+    )
+    
+    if settings.enable_semantic_cache:
+        cached = await asyncio.to_thread(semantic_cache_lookup, folder_id, dense_query, top_k)
+        if cached is not None:
+            return cached
+    
+    chunks = await asyncio.to_thread(
+        _hybrid_query, collection_name, dense_query, sparse_query, top_k
+    )
+    if settings.enable_semantic_cache:
+        await asyncio.to_thread(semantic_cache_store, folder_id, dense_query, top_k, chunks)
     return chunks
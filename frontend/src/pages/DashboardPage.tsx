@@ -70,8 +70,6 @@ export default function DashboardPage() {
               newFiles.push({ name: data.file_name, status: 'processing' })
               return {
                 ...prev,
-                status: `Processing ${data.file_name}...`,
-                currentFile: data.current,
                 files: newFiles,
               }
             })
@@ -88,6 +86,7 @@ export default function DashboardPage() {
               return {
                 ...prev,
                 status: `Processed ${data.current} of ${data.total} files`,
+                currentFile: data.current,
                 files: newFiles,
               }
             })